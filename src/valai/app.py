@@ -1,15 +1,19 @@
 import subprocess
 import sys
+from typing import Optional
 
 import typer
 from loguru import logger
 from typing_extensions import Annotated
 
+from valai.core.console import console
+
 cli_app = typer.Typer()
 
 
-@cli_app.command()
+@cli_app.callback(invoke_without_command=True)
 def run(
+    ctx: typer.Context,
     ui: Annotated[
         str,
         typer.Option(
@@ -20,6 +24,9 @@ def run(
     ] = "chainlit",
 ):
     """Run the ValAI assistant with the specified user interface."""
+    if ctx.invoked_subcommand is not None:
+        return
+
     if ui.lower() == "cli":
         logger.info("Starting ValAI in CLI mode...")
         try:
@@ -47,5 +54,109 @@ def run(
         sys.exit(1)
 
 
+@cli_app.command()
+def ingest(
+    directory: Annotated[
+        str,
+        typer.Argument(help="The directory tree to ingest into the knowledge base."),
+    ],
+    workers: Annotated[
+        Optional[int],
+        typer.Option("--workers", "-w", help="Number of parser processes."),
+    ] = None,
+    batch_size: Annotated[
+        Optional[int],
+        typer.Option("--batch-size", "-b", help="Chunks per embedding request."),
+    ] = None,
+    tenant: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Ingest into this tenant's knowledge base instead of the shared one."
+        ),
+    ] = None,
+):
+    """Incrementally ingest a directory into the knowledge base.
+    Only new or changed files are re-embedded; chunks of deleted files are removed.
+    """
+    from valai.core.ingest import ingest_directory
+
+    try:
+        report = ingest_directory(
+            directory, workers=workers, batch_size=batch_size, tenant_id=tenant
+        )
+    except NotADirectoryError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    console.print(
+        f"[bold green]Ingested '{directory}'[/bold green] in {report.elapsed_seconds}s: "
+        f"{report.scanned} scanned, {report.added} added, {report.updated} updated, "
+        f"{report.removed} removed, {report.unchanged} unchanged, "
+        f"{report.skipped} skipped ({report.chunks_embedded} chunks embedded)."
+    )
+
+
+def _check_threshold(value: Optional[float]) -> Optional[float]:
+    if value is not None and not 0 < value <= 1:
+        raise typer.BadParameter("must be greater than 0 and at most 1.")
+    return value
+
+
+@cli_app.command()
+def maintain(
+    ttl_days: Annotated[
+        Optional[float],
+        typer.Option(help="Evict conversation memories older than this (0 = never)."),
+    ] = None,
+    max_conversations: Annotated[
+        Optional[int],
+        typer.Option(help="Keep at most this many conversation memories (0 = no cap)."),
+    ] = None,
+    threshold: Annotated[
+        Optional[float],
+        typer.Option(
+            help="Cosine similarity at which two memories are duplicates, in (0, 1].",
+            callback=_check_threshold,
+        ),
+    ] = None,
+    tenant: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Maintain this tenant's knowledge base instead of the shared one."
+        ),
+    ] = None,
+    all_tenants: Annotated[
+        bool,
+        typer.Option(help="Maintain the shared knowledge base and every tenant's."),
+    ] = False,
+):
+    """Compact near-duplicate conversation memories and evict expired ones."""
+    from valai.core.maintenance import run_maintenance, run_maintenance_for_all
+    from valai.tools.knowledge_tools import get_collection, tenant_collection_name
+
+    limits = dict(
+        ttl_days=ttl_days,
+        max_conversations=max_conversations,
+        duplicate_threshold=threshold,
+    )
+    if all_tenants:
+        reports = run_maintenance_for_all(**limits)
+    else:
+        reports = {
+            tenant_collection_name(tenant): run_maintenance(
+                get_collection(tenant), **limits
+            )
+        }
+
+    for name, report in reports.items():
+        console.print(
+            f"[bold green]{name} maintained[/bold green] in {report.elapsed_seconds}s: "
+            f"{report.size_before} -> {report.size_after} document(s) "
+            f"({report.expired} expired, {report.duplicates_removed} duplicates, "
+            f"{report.evicted_over_cap} over cap). Query latency: "
+            f"{report.query_latency_ms_before} ms -> {report.query_latency_ms_after} ms."
+        )
+
+
 if __name__ == "__main__":
     cli_app()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import chainlit as cl
 
 from valai.agents.base import get_enabled_agents
@@ -20,9 +22,21 @@ from valai.core.assistant import Assistant
 enabled_agents = get_enabled_agents()
 
 
+def _session_tenant() -> Optional[str]:
+    """Identifies the knowledge base tenant for the current chat: the
+    authenticated user when auth is enabled. Anonymous chats use the shared
+    knowledge base, the same one `valai ingest` fills, so what they learn
+    outlives the chat session.
+    """
+    user = cl.user_session.get("user")
+    if user is not None:
+        return user.identifier
+    return None
+
+
 @cl.on_chat_start
 async def start_chat():
-    cl.user_session.set("assistant", Assistant())
+    cl.user_session.set("assistant", Assistant(tenant_id=_session_tenant()))
     await cl.Message(
         content="""Hello! I am ValAI, your AI assistant.
 
@@ -3,6 +3,7 @@ import sys
 
 from valai.core.assistant import Assistant
 from valai.core.console import console
+from valai.core.sandbox import close_worker_pool
 
 
 async def cli_main_loop():
@@ -31,6 +32,7 @@ async def cli_main_loop():
             # Gracefully handle Ctrl+C or end-of-file (Ctrl+D).
             break
 
+    await close_worker_pool()
     console.print("👋 Goodbye!")
 
 
@@ -66,8 +66,168 @@ class Settings(BaseSettings):
     # --- Tool API Keys ---
     tavily_api_key: str = os.getenv("TAVILY_API_KEY", "")
 
+    # --- Web Search ---
+    # Providers are queried concurrently: "merge" combines whatever arrives
+    # before the deadline, "race" returns the first provider with results.
+    search_strategy: Literal["merge", "race"] = "merge"
+    search_deadline_seconds: float = float(os.getenv("SEARCH_DEADLINE_SECONDS", 8))
+    search_max_results: int = int(os.getenv("SEARCH_MAX_RESULTS", 5))
+    # Results are cached per normalized query. Time-sensitive queries (news,
+    # prices, dates, ...) expire sooner; a TTL of 0 disables caching for that
+    # class. An empty path keeps the cache in memory only.
+    search_cache_ttl_general_seconds: float = float(
+        os.getenv("SEARCH_CACHE_TTL_GENERAL_SECONDS", 24 * 3600)
+    )
+    search_cache_ttl_news_seconds: float = float(
+        os.getenv("SEARCH_CACHE_TTL_NEWS_SECONDS", 900)
+    )
+    search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 512))
+    search_cache_path: str = os.getenv("SEARCH_CACHE_PATH", "")
+    # deep_search: result pages read, passage size, passages kept per page,
+    # and the token budget for the whole answer.
+    deep_search_pages: int = int(os.getenv("DEEP_SEARCH_PAGES", 5))
+    deep_search_passage_tokens: int = int(os.getenv("DEEP_SEARCH_PASSAGE_TOKENS", 150))
+    deep_search_passages_per_page: int = int(
+        os.getenv("DEEP_SEARCH_PASSAGES_PER_PAGE", 3)
+    )
+    deep_search_token_budget: int = int(os.getenv("DEEP_SEARCH_TOKEN_BUDGET", 3000))
+
     # --- Vector Store ---
     chroma_db_path: str = os.getenv("CHROMA_DB_PATH", "./db/chroma_db")
+    # Worker threads and per-call timeout for the async knowledge base tools.
+    knowledge_max_workers: int = int(os.getenv("KNOWLEDGE_MAX_WORKERS", 4))
+    knowledge_timeout_seconds: float = float(os.getenv("KNOWLEDGE_TIMEOUT_SECONDS", 30))
+    # Each tenant (signed-in user) gets its own collection; at most this many
+    # collection handles are kept open, least recently used first out.
+    knowledge_max_open_collections: int = int(
+        os.getenv("KNOWLEDGE_MAX_OPEN_COLLECTIONS", 128)
+    )
+    # Retrieval: candidates over-fetched for MMR re-ranking, results kept, the
+    # relevance/diversity trade-off (1.0 = relevance only) and the output budget.
+    knowledge_candidate_pool: int = int(os.getenv("KNOWLEDGE_CANDIDATE_POOL", 20))
+    knowledge_max_results: int = int(os.getenv("KNOWLEDGE_MAX_RESULTS", 5))
+    knowledge_mmr_lambda: float = float(os.getenv("KNOWLEDGE_MMR_LAMBDA", 0.5))
+    knowledge_token_budget: int = int(os.getenv("KNOWLEDGE_TOKEN_BUDGET", 1500))
+    # Maintenance of conversation memory: TTL, count cap (0 disables either),
+    # near-duplicate similarity threshold and the optional schedule (0 = off).
+    knowledge_conversation_ttl_days: float = float(
+        os.getenv("KNOWLEDGE_CONVERSATION_TTL_DAYS", 90)
+    )
+    knowledge_max_conversations: int = int(
+        os.getenv("KNOWLEDGE_MAX_CONVERSATIONS", 5000)
+    )
+    knowledge_duplicate_threshold: float = float(
+        os.getenv("KNOWLEDGE_DUPLICATE_THRESHOLD", 0.95)
+    )
+    knowledge_maintenance_batch_size: int = int(
+        os.getenv("KNOWLEDGE_MAINTENANCE_BATCH_SIZE", 512)
+    )
+    knowledge_maintenance_interval_hours: float = float(
+        os.getenv("KNOWLEDGE_MAINTENANCE_INTERVAL_HOURS", 0)
+    )
+    # Tenant collections unused for this many days are deleted by maintenance
+    # across all tenants (0 = keep them forever).
+    knowledge_tenant_idle_days: float = float(
+        os.getenv("KNOWLEDGE_TENANT_IDLE_DAYS", 180)
+    )
+
+    # --- Directory Ingestion ---
+    ingest_manifest_path: str = os.getenv(
+        "INGEST_MANIFEST_PATH", "./db/ingest_manifest.sqlite3"
+    )
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", 64))
+    ingest_chunk_size: int = int(os.getenv("INGEST_CHUNK_SIZE", 1000))
+    ingest_chunk_overlap: int = int(os.getenv("INGEST_CHUNK_OVERLAP", 100))
+
+    # --- File Tools ---
+    # Hard cap on the bytes a single read_file call returns; larger reads end
+    # with a continuation cursor.
+    file_read_max_bytes: int = int(os.getenv("FILE_READ_MAX_BYTES", 32000))
+    # Entries returned per list_directory page unless the caller asks for fewer.
+    file_list_page_size: int = int(os.getenv("FILE_LIST_PAGE_SIZE", 200))
+    # Text extracted from PDFs and HTML by read_file, keyed by path, size and mtime.
+    document_cache_path: str = os.getenv(
+        "DOCUMENT_CACHE_PATH", "./db/document_cache.sqlite3"
+    )
+    # search_files: worker processes scanning files, matches per page, and the
+    # size above which files are skipped.
+    file_search_workers: int = int(os.getenv("FILE_SEARCH_WORKERS", 8))
+    file_search_max_matches: int = int(os.getenv("FILE_SEARCH_MAX_MATCHES", 50))
+    file_search_max_file_bytes: int = int(
+        os.getenv("FILE_SEARCH_MAX_FILE_BYTES", 10 * 1024 * 1024)
+    )
+
+    # --- Web Fetching ---
+    # One pooled HTTP client is shared by the web tools.
+    http_timeout_seconds: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", 15))
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+    http_max_connections_per_host: int = int(
+        os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 4)
+    )
+    # On-disk response cache honoring Cache-Control, ETag and Last-Modified.
+    http_cache_path: str = os.getenv("HTTP_CACHE_PATH", "./db/http_cache.sqlite3")
+    http_cache_max_entries: int = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", 2000))
+    http_cache_max_body_bytes: int = int(
+        os.getenv("HTTP_CACHE_MAX_BODY_BYTES", 5 * 1024 * 1024)
+    )
+    # scrape_url stops downloading after this many bytes and caps its output.
+    scrape_max_bytes: int = int(os.getenv("SCRAPE_MAX_BYTES", 2 * 1024 * 1024))
+    scrape_token_budget: int = int(os.getenv("SCRAPE_TOKEN_BUDGET", 3000))
+    # scrape_urls: pages fetched at once, retries for transient failures, and
+    # the token budget shared by all pages of one call.
+    scrape_max_concurrency: int = int(os.getenv("SCRAPE_MAX_CONCURRENCY", 8))
+    scrape_retries: int = int(os.getenv("SCRAPE_RETRIES", 2))
+    scrape_urls_token_budget: int = int(os.getenv("SCRAPE_URLS_TOKEN_BUDGET", 8000))
+
+    # --- Code Execution ---
+    # run_python_code uses a pool of warm interpreter processes, each recycled
+    # after this many runs. Every run is capped in wall time and CPU time, and
+    # every worker in memory (address space).
+    code_pool_size: int = int(os.getenv("CODE_POOL_SIZE", 2))
+    code_worker_max_executions: int = int(os.getenv("CODE_WORKER_MAX_EXECUTIONS", 50))
+    code_timeout_seconds: float = float(os.getenv("CODE_TIMEOUT_SECONDS", 30))
+    code_cpu_seconds: int = int(os.getenv("CODE_CPU_SECONDS", 30))
+    code_memory_limit_mb: int = int(os.getenv("CODE_MEMORY_LIMIT_MB", 512))
+    # Output kept per stream: the head is streamed as it is printed; past it,
+    # only the last tail bytes are kept, and the cut is marked.
+    code_output_head_bytes: int = int(os.getenv("CODE_OUTPUT_HEAD_BYTES", 16000))
+    code_output_tail_bytes: int = int(os.getenv("CODE_OUTPUT_TAIL_BYTES", 4000))
+    # run_python_session: one persistent interpreter per conversation, closed
+    # after this many idle seconds; at most this many are open at once.
+    code_session_idle_seconds: float = float(
+        os.getenv("CODE_SESSION_IDLE_SECONDS", 900)
+    )
+    code_max_sessions: int = int(os.getenv("CODE_MAX_SESSIONS", 8))
+    code_session_memory_limit_mb: int = int(
+        os.getenv("CODE_SESSION_MEMORY_LIMIT_MB", 1024)
+    )
+
+    # --- Calendar ---
+    # Events are read from a local store kept current with incremental sync;
+    # it syncs at most once per interval, starting this many days back.
+    calendar_cache_path: str = os.getenv(
+        "CALENDAR_CACHE_PATH", "./db/calendar_cache.sqlite3"
+    )
+    calendar_sync_interval_seconds: float = float(
+        os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", 60)
+    )
+    calendar_sync_past_days: int = int(os.getenv("CALENDAR_SYNC_PAST_DAYS", 30))
+    # Time zone (IANA name) for new events and free-slot searches; empty means
+    # the system's local zone. Free slots are only offered within working hours.
+    calendar_timezone: str = os.getenv("CALENDAR_TIMEZONE", "")
+    calendar_work_start: str = os.getenv("CALENDAR_WORK_START", "09:00")
+    calendar_work_end: str = os.getenv("CALENDAR_WORK_END", "17:00")
+
+    # --- System Metrics ---
+    # A background thread samples CPU, memory, disk, network and the ValAI
+    # process at this interval and keeps this much history.
+    system_metrics_interval_seconds: float = float(
+        os.getenv("SYSTEM_METRICS_INTERVAL_SECONDS", 2)
+    )
+    system_metrics_history_seconds: float = float(
+        os.getenv("SYSTEM_METRICS_HISTORY_SECONDS", 900)
+    )
 
     # --- Email Server Settings ---
     smtp_host: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -1,6 +1,8 @@
+import asyncio
 import re
+import uuid
 from datetime import datetime
-from typing import AsyncGenerator, Dict
+from typing import AsyncGenerator, Dict, Optional
 
 from loguru import logger
 from pydantic_ai import Agent
@@ -9,6 +11,10 @@ from pydantic_ai.agent import AgentRunResult
 from valai.agents.base import Route, load_agents, load_router
 from valai.core.console import console
 from valai.core.history import ConversationHistory
+from valai.core.maintenance import start_maintenance_scheduler
+from valai.core.status import current_status_queue, relay_statuses
+from valai.core.system_metrics import start_metrics_sampler
+from valai.core.tenancy import set_current_conversation, set_current_tenant
 
 # from valai.core.rag_pipeline import BackgroundRAG
 
@@ -16,8 +22,17 @@ from valai.core.history import ConversationHistory
 class Assistant:
     """Orchestrates the agent routing and execution logic asynchronously."""
 
-    def __init__(self):
-        """Initializes the assistant and all its components."""
+    def __init__(self, tenant_id: Optional[str] = None):
+        """Initializes the assistant and all its components.
+
+        Args:
+            tenant_id: The user or session whose knowledge base this assistant
+                reads and writes. None uses the shared knowledge base.
+
+        """
+        self.tenant_id = tenant_id
+        # Identifies this conversation to tools that keep per-conversation state.
+        self.conversation_id = uuid.uuid4().hex
         logger.add(
             "logs/valai_assistant.log",
             rotation="10 MB",
@@ -30,6 +45,8 @@ class Assistant:
         self.specialists: Dict[str, Agent] = load_agents()
         self.history = ConversationHistory()
         # self.rag_pipeline = BackgroundRAG()
+        start_maintenance_scheduler()
+        start_metrics_sampler()
         console.log("✅ Assistant is ready.")
 
     async def _get_routing_decision(self, query: str) -> Route:  # type: ignore
@@ -75,6 +92,8 @@ class Assistant:
         """Processes a query, applying a smart guardrail for the Search Agent
         before yielding status updates and the final answer.
         """
+        set_current_tenant(self.tenant_id)
+        set_current_conversation(self.conversation_id)
         self.history.add("user", query)
 
         try:
@@ -101,7 +120,17 @@ class Assistant:
 
             yield {"status": f"🚦 Routing to: {route.specialist_name}"}
             yield {"status": f"🛠️ Specialist '{route.specialist_name}' is working..."}
-            response = await self._execute_specialist_task(route)
+            # Tools report progress (e.g. streamed code output) through this queue
+            # while the specialist runs.
+            queue: asyncio.Queue = asyncio.Queue()
+            current_status_queue.set(queue)
+            task = asyncio.ensure_future(self._execute_specialist_task(route))
+            try:
+                async for update in relay_statuses(task, queue):
+                    yield update
+            finally:
+                task.cancel()
+            response = task.result()
 
         except Exception as e:
             logger.exception(f"An unexpected error occurred in process_query: {e}")
@@ -0,0 +1,189 @@
+import datetime
+import json
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from valai.config import get_settings
+from valai.core.scheduling import resolve_timezone
+from valai.core.storage import open_database
+
+CALENDAR_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        calendar_id TEXT NOT NULL,
+        id TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        start_ts REAL NOT NULL,
+        end_ts REAL NOT NULL,
+        all_day INTEGER NOT NULL,
+        -- Events marked "available" (transparent) do not block time.
+        transparent INTEGER NOT NULL,
+        event TEXT NOT NULL,
+        PRIMARY KEY (calendar_id, id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_start ON events(calendar_id, start_ts);
+    CREATE TABLE IF NOT EXISTS sync_state (
+        calendar_id TEXT PRIMARY KEY,
+        sync_token TEXT,
+        synced_at REAL NOT NULL
+    );
+    """,
+]
+
+# The most an all-day event's stored times can differ from the same dates
+# read in another zone: UTC offsets range from -12 to +14 hours.
+ALL_DAY_SLACK_SECONDS = 26 * 3600
+
+
+def _cache_path() -> Path:
+    """Returns the event store database, creating its directory if needed."""
+    path = Path(get_settings().calendar_cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _midnight(date: str, tz: datetime.tzinfo) -> float:
+    """Returns the timestamp at which an ISO date begins in `tz`."""
+    day = datetime.date.fromisoformat(date)
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=tz).timestamp()
+
+
+def _timestamp(moment: dict, tz: datetime.tzinfo) -> Tuple[float, bool]:
+    """Converts an API start/end ({"dateTime": ...} or {"date": ...}) into a
+    timestamp, and tells whether it is an all-day date. A date-time without a
+    UTC offset is read in its "timeZone"; dates are taken as midnight in `tz`.
+    """
+    if "dateTime" in moment:
+        value = datetime.datetime.fromisoformat(moment["dateTime"])
+        if value.tzinfo is None and moment.get("timeZone"):
+            value = value.replace(tzinfo=ZoneInfo(moment["timeZone"]))
+        return value.timestamp(), False
+    return _midnight(moment["date"], tz), True
+
+
+def _row(calendar_id: str, event: dict, tz: datetime.tzinfo) -> tuple:
+    start_ts, all_day = _timestamp(event["start"], tz)
+    end_ts, _ = _timestamp(event["end"], tz)
+    return (
+        calendar_id,
+        event["id"],
+        event.get("summary") or "(no title)",
+        start_ts,
+        end_ts,
+        all_day,
+        event.get("transparency") == "transparent",
+        json.dumps(event),
+    )
+
+
+UPSERT_SQL = (
+    "INSERT OR REPLACE INTO events "
+    "(calendar_id, id, summary, start_ts, end_ts, all_day, transparent, event) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def get_sync_state(calendar_id: str) -> Tuple[Optional[str], Optional[float]]:
+    """Returns the calendar's sync token and last sync time, if it was synced."""
+    with open_database(_cache_path(), CALENDAR_MIGRATIONS) as conn:
+        row = conn.execute(
+            "SELECT sync_token, synced_at FROM sync_state WHERE calendar_id = ?",
+            (calendar_id,),
+        ).fetchone()
+    return (row["sync_token"], row["synced_at"]) if row else (None, None)
+
+
+def apply_changes(
+    calendar_id: str,
+    events: Iterable[dict],
+    sync_token: Optional[str],
+    full: bool = False,
+):
+    """Applies a page of synced events in one transaction: cancelled events are
+    removed, the others inserted or updated. A full sync first drops every
+    stored event of the calendar.
+    """
+    # All-day dates are stored in the calendar's zone.
+    tz = resolve_timezone(get_settings().calendar_timezone)
+    with open_database(_cache_path(), CALENDAR_MIGRATIONS, immediate=True) as conn:
+        if full:
+            conn.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+        for event in events:
+            if event.get("status") == "cancelled":
+                conn.execute(
+                    "DELETE FROM events WHERE calendar_id = ? AND id = ?",
+                    (calendar_id, event["id"]),
+                )
+            else:
+                conn.execute(UPSERT_SQL, _row(calendar_id, event, tz))
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, synced_at) "
+            "VALUES (?, ?, ?)",
+            (calendar_id, sync_token, time.time()),
+        )
+
+
+def upsert_events(calendar_id: str, events: Iterable[dict]):
+    """Stores events the assistant just created, so reads see them right away."""
+    tz = resolve_timezone(get_settings().calendar_timezone)
+    rows = [_row(calendar_id, event, tz) for event in events]
+    with open_database(_cache_path(), CALENDAR_MIGRATIONS) as conn:
+        conn.executemany(UPSERT_SQL, rows)
+
+
+def events_between(
+    calendar_id: str,
+    start_ts: float,
+    end_ts: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """Returns the stored events overlapping [start_ts, end_ts), by start time."""
+    query = "SELECT event FROM events WHERE calendar_id = ? AND end_ts > ?"
+    params: list = [calendar_id, start_ts]
+    if end_ts is not None:
+        query += " AND start_ts < ?"
+        params.append(end_ts)
+    query += " ORDER BY start_ts, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    with open_database(_cache_path(), CALENDAR_MIGRATIONS) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [json.loads(row["event"]) for row in rows]
+
+
+def busy_intervals(
+    calendar_id: str, start_ts: float, end_ts: float, tz: datetime.tzinfo
+) -> List[Tuple[float, float]]:
+    """Returns the (start, end) timestamps of the stored events that block time
+    within [start_ts, end_ts). Timed events are read from the indexed columns
+    alone; all-day events span their dates in `tz`, the zone being searched.
+    """
+    with open_database(_cache_path(), CALENDAR_MIGRATIONS) as conn:
+        rows = conn.execute(
+            "SELECT start_ts, end_ts, CASE WHEN all_day THEN event END AS event "
+            "FROM events WHERE calendar_id = ? AND NOT transparent "
+            "AND end_ts > ? - (all_day * ?) AND start_ts < ? + (all_day * ?) "
+            "ORDER BY start_ts",
+            (
+                calendar_id,
+                start_ts,
+                ALL_DAY_SLACK_SECONDS,
+                end_ts,
+                ALL_DAY_SLACK_SECONDS,
+            ),
+        ).fetchall()
+    intervals = []
+    for row in rows:
+        busy = (row["start_ts"], row["end_ts"])
+        if row["event"] is not None:
+            event = json.loads(row["event"])
+            busy = (
+                _midnight(event["start"]["date"], tz),
+                _midnight(event["end"]["date"], tz),
+            )
+        if busy[1] > start_ts and busy[0] < end_ts:
+            intervals.append(busy)
+    return intervals
@@ -0,0 +1,174 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from pypdf import PdfReader
+
+from valai.config import get_settings
+from valai.core.storage import open_database
+
+PDF_SUFFIXES = {".pdf"}
+HTML_SUFFIXES = {".html", ".htm", ".xhtml"}
+
+# HTML elements that never contain readable text.
+NON_TEXT_TAGS = ["script", "style", "noscript", "template", "svg"]
+
+# HTML elements that start a new line of text.
+BLOCK_TAGS = [
+    "p",
+    "div",
+    "br",
+    "li",
+    "tr",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "pre",
+    "blockquote",
+    "section",
+    "article",
+    "header",
+    "footer",
+    "table",
+]
+
+DOCUMENT_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        page_count INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS pages (
+        path TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (path, page)
+    );
+    """,
+]
+
+
+def is_document(path: Path) -> bool:
+    """Tells whether a file needs text extraction rather than being read as text."""
+    return path.suffix.lower() in PDF_SUFFIXES | HTML_SUFFIXES
+
+
+def _html_to_text(data: bytes) -> str:
+    """Extracts the readable text of an HTML page, dropping blank lines."""
+    soup = BeautifulSoup(data, "html.parser")
+    for tag in soup(NON_TEXT_TAGS):
+        tag.decompose()
+    # Block elements become their own lines; inline markup stays within its line.
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_after("\n")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in soup.get_text().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _cache_path() -> Path:
+    """Returns the extraction cache database, creating its directory if needed."""
+    path = Path(get_settings().document_cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class ExtractedDocument:
+    """The text of a PDF or HTML file, extracted one page at a time on demand.
+
+    Extracted pages are kept in a SQLite cache keyed by the file's path, size
+    and mtime, so reading the same document again costs a lookup instead of a
+    parse. Any change to the file invalidates all of its cached pages.
+    """
+
+    def __init__(self, path: Path):
+        """Opens a document, reusing cached pages when the file is unchanged.
+
+        Args:
+            path: The PDF or HTML file.
+
+        """
+        self.path = path
+        self.key = str(path.resolve())
+        self._reader: Optional[PdfReader] = None
+        stat = path.stat()
+        with open_database(_cache_path(), DOCUMENT_MIGRATIONS) as conn:
+            row = conn.execute(
+                "SELECT size, mtime_ns, page_count FROM documents WHERE path = ?",
+                (self.key,),
+            ).fetchone()
+        if row and (row["size"], row["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            self.page_count = row["page_count"]
+            return
+
+        self.page_count = self._count_pages()
+        with open_database(_cache_path(), DOCUMENT_MIGRATIONS) as conn:
+            conn.execute("DELETE FROM pages WHERE path = ?", (self.key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (path, size, mtime_ns, page_count) "
+                "VALUES (?, ?, ?, ?)",
+                (self.key, stat.st_size, stat.st_mtime_ns, self.page_count),
+            )
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.path.suffix.lower() in PDF_SUFFIXES
+
+    def _pdf(self) -> PdfReader:
+        """Returns the PDF reader, opening the file on first use."""
+        if self._reader is None:
+            self._reader = PdfReader(self.path)
+        return self._reader
+
+    def _count_pages(self) -> int:
+        return len(self._pdf().pages) if self.is_pdf else 1
+
+    def _extract(self, number: int) -> str:
+        """Extracts the text of one page (1-based)."""
+        if self.is_pdf:
+            return self._pdf().pages[number - 1].extract_text() or ""
+        return _html_to_text(self.path.read_bytes())
+
+    def pages(
+        self, start: int = 1, end: Optional[int] = None
+    ) -> Iterator[Tuple[int, str]]:
+        """Yields (page number, text) for pages `start` to `end` (inclusive),
+        extracting and caching only the pages that are not cached yet.
+        Stopping the iteration early leaves later pages unextracted.
+        """
+        end = min(end or self.page_count, self.page_count)
+        with open_database(_cache_path(), DOCUMENT_MIGRATIONS) as conn:
+            cached: Dict[int, str] = {
+                row["page"]: row["text"]
+                for row in conn.execute(
+                    "SELECT page, text FROM pages "
+                    "WHERE path = ? AND page BETWEEN ? AND ?",
+                    (self.key, start, end),
+                )
+            }
+        for number in range(start, end + 1):
+            text = cached.get(number)
+            if text is None:
+                text = self._extract(number)
+                # Each page is committed on its own, so no lock is held while parsing.
+                with open_database(_cache_path(), DOCUMENT_MIGRATIONS) as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO pages (path, page, text) VALUES (?, ?, ?)",
+                        (self.key, number, text),
+                    )
+            yield number, text
+
+    def format_page(self, number: int, text: str) -> str:
+        """Prefixes a PDF page's text with a page marker."""
+        return f"--- Page {number} ---\n{text}" if self.is_pdf else text
+
+    def text(self, start: int = 1, end: Optional[int] = None) -> str:
+        """Returns the text of a page range, with a marker before each PDF page."""
+        return "\n\n".join(
+            self.format_page(number, text) for number, text in self.pages(start, end)
+        )
@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+_EXECUTORS: Dict[str, ThreadPoolExecutor] = {}
+_PROCESS_POOLS: Dict[str, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """Returns a named, bounded thread pool, creating it on first use.
+    Each subsystem gets its own pool so that slow work in one (e.g. embedding
+    requests) cannot exhaust the workers another one depends on.
+    """
+    # Sync tools run on worker threads, so two of them may ask for a pool at once.
+    with _executors_lock:
+        executor = _EXECUTORS.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"valai-{name}"
+            )
+            _EXECUTORS[name] = executor
+            logger.info(f"Created '{name}' executor with {max_workers} worker(s).")
+    return executor
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """Returns a named process pool, creating it on first use. For CPU-bound
+    pure-Python work (e.g. regex scans), which threads cannot parallelize
+    because it holds the GIL.
+    """
+    with _executors_lock:
+        pool = _PROCESS_POOLS.get(name)
+        if pool is None:
+            # Forking a process that runs threads can copy held locks into the
+            # child, so workers are spawned fresh instead.
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _PROCESS_POOLS[name] = pool
+            logger.info(f"Created '{name}' process pool with {max_workers} worker(s).")
+    return pool
+
+
+async def run_blocking(
+    executor: ThreadPoolExecutor,
+    func: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> T:
+    """Runs a blocking callable on the given executor without stalling the event loop.
+
+    Args:
+        executor: The pool to run the callable on.
+        func: The blocking callable.
+        *args: Positional arguments for the callable.
+        timeout: Seconds to wait for a result before raising `TimeoutError`.
+            The worker thread itself cannot be interrupted and keeps running
+            in the background until the call returns.
+        **kwargs: Keyword arguments for the callable.
+
+    Returns:
+        The callable's return value.
+
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the current tenant) into the worker thread.
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+    return await asyncio.wait_for(future, timeout=timeout)
@@ -0,0 +1,246 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from valai.core.tokens import estimate_tokens, truncate_to_tokens
+
+# lxml is several times faster than html.parser on large pages.
+HTML_PARSER = "lxml"
+
+# Elements that never hold main content.
+NON_CONTENT_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+    "button",
+    "nav",
+    "aside",
+    "footer",
+]
+
+# An id or class token that marks navigation, banners and other page chrome:
+# one of these words, alone or followed by a "-"/"_" suffix ("sidebar",
+# "menu-main"). Tokens like "has-sidebar" or "entry-content" do not match.
+BOILERPLATE_PATTERN = re.compile(
+    r"^(cookie|consent|banner|breadcrumbs?|menu|navbar|sidebar|footer|share|"
+    r"social|advert|promo|related|comment|subscribe|newsletter|popup|modal)"
+    r"([-_].*)?$",
+    re.IGNORECASE,
+)
+
+# Tags whose text counts as a page's paragraph text.
+PARAGRAPH_TAGS = ["p", "pre", "li"]
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "section",
+    "article",
+    "main",
+    "blockquote",
+    "pre",
+    "table",
+    "tr",
+    "td",
+    "th",
+    "dd",
+    "dt",
+    "ul",
+    "ol",
+    "figcaption",
+}
+
+# A candidate container needs at least this much paragraph text to be
+# preferred over the whole <body>.
+MIN_MAIN_CONTENT_CHARS = 250
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    """Tells whether one of an element's id or class tokens marks it as page
+    chrome.
+    """
+    if tag.attrs is None:
+        return False
+    tokens = [*(tag.get("id") or "").split(), *(tag.get("class") or [])]
+    return any(BOILERPLATE_PATTERN.match(token) for token in tokens)
+
+
+def _paragraph_chars(tag: Tag) -> int:
+    """Returns the length of the paragraph text inside an element."""
+    return sum(
+        len(paragraph.get_text(strip=True))
+        for paragraph in tag.find_all(PARAGRAPH_TAGS)
+    )
+
+
+def _strip_boilerplate(soup: BeautifulSoup):
+    """Removes non-content elements in place."""
+    for tag in soup(NON_CONTENT_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda s: isinstance(s, Comment)):
+        comment.extract()
+    total = _paragraph_chars(soup)
+    for tag in soup.find_all(_is_boilerplate):
+        if tag.decomposed or tag.name in ("html", "body", "main", "article"):
+            continue
+        # A chrome-looking wrapper that holds most of the text is the content.
+        if 2 * _paragraph_chars(tag) > total:
+            continue
+        tag.decompose()
+    # A page header is chrome; a header inside an article holds its title.
+    for tag in soup.find_all("header"):
+        if not tag.find_parent(["article", "main"]):
+            tag.decompose()
+
+
+def _main_container(soup: BeautifulSoup) -> Tag:
+    """Picks the element holding the main content: an explicit <main> or
+    <article> if there is one, otherwise the element whose paragraphs carry the
+    most text, scoring each paragraph's parent fully and its grandparent half.
+    """
+    explicit = soup.find("main") or soup.find(attrs={"role": "main"})
+    articles = soup.find_all("article")
+    if articles:
+        explicit = max(articles, key=lambda a: len(a.get_text()))
+    if explicit is not None:
+        return explicit
+
+    scores: Dict[int, float] = {}
+    elements: Dict[int, Tag] = {}
+    for paragraph in soup.find_all(PARAGRAPH_TAGS):
+        length = len(paragraph.get_text(strip=True))
+        if length < 25:
+            continue
+        parent = paragraph.parent
+        grandparent = parent.parent if parent is not None else None
+        for ancestor, weight in ((parent, 1.0), (grandparent, 0.5)):
+            if isinstance(ancestor, Tag):
+                key = id(ancestor)
+                scores[key] = scores.get(key, 0.0) + length * weight
+                elements[key] = ancestor
+    body = soup.body or soup
+    if not scores:
+        return body
+    best = max(scores, key=scores.__getitem__)
+    return elements[best] if scores[best] >= MIN_MAIN_CONTENT_CHARS else body
+
+
+class _Renderer:
+    """Renders an element tree as compact Markdown-like text: headings become
+    '#' lines, list items '- ' lines, and links numbered references.
+    """
+
+    def __init__(self, base_url: str, include_links: bool = True):
+        self.base_url = base_url
+        self.include_links = include_links
+        self.lines: List[str] = []
+        self.links: Dict[str, int] = {}
+        self._inline: List[str] = []
+
+    def flush(self, prefix: str = ""):
+        """Ends the current line of inline text, if any."""
+        text = re.sub(r"\s+", " ", "".join(self._inline)).strip()
+        self._inline = []
+        if text:
+            self.lines.append(prefix + text)
+
+    def link(self, anchor: Tag):
+        """Appends a numbered reference for an anchor with a usable target."""
+        if not self.include_links:
+            return
+        href = (anchor.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:")):
+            return
+        if not anchor.get_text(strip=True):
+            return
+        url = urljoin(self.base_url, href)
+        number = self.links.setdefault(url, len(self.links) + 1)
+        self._inline.append(f" [{number}]")
+
+    def walk(self, node: Tag):
+        """Renders the children of `node` in document order."""
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                self._inline.append(str(child))
+                continue
+            if not isinstance(child, Tag):
+                continue
+            name = child.name
+            if name in HEADING_TAGS:
+                self.flush()
+                self.walk(child)
+                self.flush("#" * int(name[1]) + " ")
+            elif name == "li":
+                self.flush()
+                self.walk(child)
+                self.flush("- ")
+            elif name == "a":
+                self.walk(child)
+                self.link(child)
+            elif name == "br":
+                self.flush()
+            elif name in BLOCK_TAGS:
+                self.flush()
+                self.walk(child)
+                self.flush()
+            else:
+                self.walk(child)
+
+
+def extract_main_content(
+    html: bytes,
+    base_url: str,
+    token_budget: Optional[int] = None,
+    include_links: bool = True,
+) -> str:
+    """Extracts the main content of an HTML page as compact text.
+
+    Navigation, banners, footers and similar chrome are removed, the element
+    holding the main content is picked, and it is rendered with Markdown-style
+    headings and list items. Links become numbered references, listed after the
+    text.
+
+    Args:
+        html: The raw page.
+        base_url: The page URL, used to resolve relative links.
+        token_budget: Approximate token cap for the whole result, links included.
+        include_links: Whether to number links and list them. When False, the
+            result is the plain text only.
+
+    Returns:
+        The extracted text.
+
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    _strip_boilerplate(soup)
+    renderer = _Renderer(base_url, include_links)
+    renderer.walk(_main_container(soup))
+    renderer.flush()
+
+    lines = renderer.lines
+    if title and not (lines and lines[0].startswith("#")):
+        lines.insert(0, f"# {title}")
+    text = "\n".join(lines)
+    link_lines = [f"[{number}] {url}" for url, number in renderer.links.items()]
+    if token_budget is None:
+        return text + ("\n\nLinks:\n" + "\n".join(link_lines) if link_lines else "")
+
+    # Links get at most a quarter of the budget; the text gets the rest.
+    links_budget = min(
+        estimate_tokens("\n\nLinks:\n" + "\n".join(link_lines)), token_budget // 4
+    )
+    text = truncate_to_tokens(text, token_budget - links_budget)
+    cited = set(re.findall(r"\[(\d+)\]", text))
+    kept = [line for line in link_lines if line[1 : line.index("]")] in cited]
+    if kept:
+        links = truncate_to_tokens("\n".join(kept), links_budget, marker="\n[…]")
+        text += "\n\nLinks:\n" + links
+    return text
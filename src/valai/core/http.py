@@ -0,0 +1,366 @@
+import asyncio
+import json
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel
+
+from valai.config import get_settings
+from valai.core.executors import get_executor, run_blocking
+from valai.core.storage import open_database
+
+T = TypeVar("T")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Headers describing the 304 itself rather than the cached representation.
+NOT_MERGED_ON_304 = {"content-length", "content-encoding", "transfer-encoding"}
+
+# Request headers a response may vary on and still be cached under its URL
+# alone: httpx always sends the same Accept-Encoding and decodes the body.
+CACHEABLE_VARY = {"accept-encoding"}
+
+# Upper bound on the heuristic freshness given to responses that only carry
+# Last-Modified (RFC 9111, section 4.2.2).
+MAX_HEURISTIC_FRESHNESS_SECONDS = 24 * 3600
+
+HTTP_CACHE_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS responses (
+        url TEXT PRIMARY KEY,
+        final_url TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        headers TEXT NOT NULL,
+        body BLOB NOT NULL,
+        stored_at REAL NOT NULL,
+        fresh_until REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_stored_at ON responses(stored_at);
+    """,
+    # Bodies cut off by a byte cap are cached too, and only reused for reads
+    # whose cap they cover.
+    """
+    ALTER TABLE responses ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0;
+    """,
+]
+
+# Clients and per-host limits are bound to the event loop they were created on.
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_host_limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+class FetchResult(BaseModel):
+    """A fetched (or cached) HTTP response."""
+
+    url: str
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+    from_cache: bool = False
+    truncated: bool = False
+
+
+class HttpCacheMetrics(BaseModel):
+    """Counters for the on-disk HTTP cache since the process started."""
+
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    stored: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of requests answered without downloading the body again."""
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+
+_metrics = HttpCacheMetrics()
+
+
+def get_http_cache_metrics() -> HttpCacheMetrics:
+    """Returns a snapshot of the HTTP cache counters."""
+    return _metrics.model_copy()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared, connection-pooling HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        settings = get_settings()
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=settings.http_timeout_seconds,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+@asynccontextmanager
+async def host_slot(url: str) -> AsyncIterator[None]:
+    """Holds one of the `http_max_connections_per_host` slots for the URL's host."""
+    loop = asyncio.get_running_loop()
+    limits = _host_limits.setdefault(loop, {})
+    host = urlsplit(url).netloc.lower()
+    semaphore = limits.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_settings().http_max_connections_per_host)
+        limits[host] = semaphore
+    async with semaphore:
+        yield
+
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Parses a Cache-Control header into {directive: value or None}."""
+    directives: Dict[str, Optional[str]] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    """Parses an HTTP date header into a timestamp."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _freshness_lifetime(headers: Dict[str, str]) -> float:
+    """Returns how many seconds a response may be served without revalidation."""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0.0
+    age = float(headers.get("age", "0") or 0)
+    if directives.get("max-age"):
+        try:
+            return max(0.0, int(directives["max-age"]) - age)
+        except ValueError:
+            return 0.0
+    date = _http_date(headers.get("date")) or time.time()
+    expires = _http_date(headers.get("expires"))
+    if expires is not None:
+        return max(0.0, expires - date - age)
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(
+            0.1 * max(0.0, date - last_modified), MAX_HEURISTIC_FRESHNESS_SECONDS
+        )
+    return 0.0
+
+
+def _varies_on_request(headers: Dict[str, str]) -> bool:
+    """Tells whether a response depends on request headers the cache key (the
+    URL) does not include. `Vary: *` always does.
+    """
+    varied = {name.strip().lower() for name in headers.get("vary", "").split(",")}
+    return bool(varied - CACHEABLE_VARY - {""})
+
+
+def _is_storable(status: int, headers: Dict[str, str], body: bytes) -> bool:
+    """Tells whether a response may be stored: a 200 without `no-store` or a
+    `Vary` on request headers, which is either fresh for a while or can be
+    revalidated later.
+    """
+    if status != 200 or "no-store" in _cache_control(headers):
+        return False
+    if _varies_on_request(headers):
+        return False
+    if len(body) > get_settings().http_cache_max_body_bytes:
+        return False
+    return bool(
+        _freshness_lifetime(headers) or "etag" in headers or "last-modified" in headers
+    )
+
+
+def _cache_path() -> Path:
+    """Returns the cache database, creating its directory if needed."""
+    path = Path(get_settings().http_cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _load(url: str) -> Optional[dict]:
+    """Returns the cache entry for a URL, with its headers decoded, if any."""
+    with open_database(_cache_path(), HTTP_CACHE_MIGRATIONS) as conn:
+        row = conn.execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["headers"] = json.loads(entry["headers"])
+    return entry
+
+
+def _store(
+    url: str, final_url: str, headers: Dict[str, str], body: bytes, truncated: bool
+):
+    """Stores a 200 response, evicting the oldest entries beyond the cap."""
+    now = time.time()
+    with open_database(_cache_path(), HTTP_CACHE_MIGRATIONS) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, final_url, status, headers, body, stored_at, fresh_until, truncated) "
+            "VALUES (?, ?, 200, ?, ?, ?, ?, ?)",
+            (
+                url,
+                final_url,
+                json.dumps(headers),
+                body,
+                now,
+                now + _freshness_lifetime(headers),
+                truncated,
+            ),
+        )
+        # Keep the cache bounded: the least recently stored entries go first.
+        conn.execute(
+            "DELETE FROM responses WHERE url IN (SELECT url FROM responses "
+            "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (get_settings().http_cache_max_entries,),
+        )
+
+
+def _refresh(url: str, headers: Dict[str, str]):
+    """Restarts an entry's freshness after a successful revalidation."""
+    now = time.time()
+    with open_database(_cache_path(), HTTP_CACHE_MIGRATIONS) as conn:
+        conn.execute(
+            "UPDATE responses SET headers = ?, stored_at = ?, fresh_until = ? "
+            "WHERE url = ?",
+            (json.dumps(headers), now, now + _freshness_lifetime(headers), url),
+        )
+
+
+async def _run_cache(func: Callable[..., T], *args) -> T:
+    """Runs a cache database operation off the event loop."""
+    return await run_blocking(get_executor("http-cache", 2), func, *args)
+
+
+def _covers(entry: dict, max_bytes: Optional[int]) -> bool:
+    """Tells whether a cached body is complete enough for a read capped at `max_bytes`."""
+    if not entry["truncated"]:
+        return True
+    return max_bytes is not None and len(entry["body"]) >= max_bytes
+
+
+def _cached_result(entry: dict, max_bytes: Optional[int]) -> FetchResult:
+    """Turns a cache entry into a fetch result, applying the byte cap."""
+    body = entry["body"]
+    truncated = bool(entry["truncated"])
+    if max_bytes is not None and len(body) > max_bytes:
+        body, truncated = body[:max_bytes], True
+    return FetchResult(
+        url=entry["final_url"],
+        status=entry["status"],
+        headers=entry["headers"],
+        content=body,
+        from_cache=True,
+        truncated=truncated,
+    )
+
+
+async def _read_capped(
+    response: httpx.Response, max_bytes: Optional[int]
+) -> Tuple[bytes, bool]:
+    """Reads a streamed body, stopping once `max_bytes` have arrived.
+    Returns the body and whether it was cut off.
+    """
+    chunks = []
+    received = 0
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        received += len(chunk)
+        if max_bytes is not None and received >= max_bytes:
+            return b"".join(chunks)[:max_bytes], True
+    return b"".join(chunks), False
+
+
+async def fetch(url: str, max_bytes: Optional[int] = None) -> FetchResult:
+    """Fetches a URL with the shared client, through the on-disk HTTP cache.
+
+    Fresh cached responses (per Cache-Control, Expires or a Last-Modified
+    heuristic) are returned without a request. Stale ones that carry an ETag or
+    Last-Modified are revalidated with a conditional request, and a 304 reuses
+    the cached body. The body is streamed, and the download stops at `max_bytes`.
+
+    Args:
+        url: The URL to GET.
+        max_bytes: Stop reading the body after this many bytes. None reads it all.
+
+    Returns:
+        The response, with `from_cache` set when the body came from the cache
+        and `truncated` set when it was cut off at `max_bytes`.
+
+    Raises:
+        httpx.HTTPError: If the request fails or returns an error status.
+
+    """
+    entry = await _run_cache(_load, url)
+    # Entries stored before Vary was checked are not reused either.
+    if entry and (
+        not _covers(entry, max_bytes) or _varies_on_request(entry["headers"])
+    ):
+        entry = None
+    request_headers = {}
+    if entry:
+        if entry["fresh_until"] > time.time():
+            _metrics.hits += 1
+            return _cached_result(entry, max_bytes)
+        if "etag" in entry["headers"]:
+            request_headers["If-None-Match"] = entry["headers"]["etag"]
+        if "last-modified" in entry["headers"]:
+            request_headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+    async with host_slot(url):
+        async with get_http_client().stream(
+            "GET", url, headers=request_headers
+        ) as response:
+            if response.status_code == 304 and entry:
+                _metrics.revalidated += 1
+                headers = {**entry["headers"]}
+                headers.update(
+                    {
+                        k.lower(): v
+                        for k, v in response.headers.items()
+                        if k.lower() not in NOT_MERGED_ON_304
+                    }
+                )
+                await _run_cache(_refresh, url, headers)
+                entry["headers"] = headers
+                return _cached_result(entry, max_bytes)
+
+            _metrics.misses += 1
+            response.raise_for_status()
+            body, truncated = await _read_capped(response, max_bytes)
+
+    headers = {k.lower(): v for k, v in response.headers.items()}
+    if _is_storable(response.status_code, headers, body):
+        await _run_cache(_store, url, str(response.url), headers, body, truncated)
+        _metrics.stored += 1
+    logger.debug(
+        f"Fetched '{url}' ({len(body)} bytes{', truncated' if truncated else ''}); "
+        f"HTTP cache hit rate {_metrics.hit_rate:.0%}."
+    )
+    return FetchResult(
+        url=str(response.url),
+        status=response.status_code,
+        headers=headers,
+        content=body,
+        truncated=truncated,
+    )
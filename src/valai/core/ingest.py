@@ -0,0 +1,352 @@
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chromadb
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from loguru import logger
+from pydantic import BaseModel
+from pypdf import PdfReader
+
+from valai.config import get_settings
+from valai.tools.knowledge_tools import get_collection, tenant_collection_name
+
+# Directories that are never worth ingesting.
+SKIPPED_DIRS = {"__pycache__", "node_modules", ".git", ".venv", "venv"}
+
+# Bytes sniffed from the start of a file to decide whether it is binary.
+BINARY_SNIFF_BYTES = 8192
+
+
+class IngestReport(BaseModel):
+    """Summary of a single ingestion run."""
+
+    scanned: int = 0
+    unchanged: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    skipped: int = 0
+    chunks_embedded: int = 0
+    elapsed_seconds: float = 0.0
+
+
+class ManifestEntry(BaseModel):
+    """What the manifest remembers about an ingested file."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    chunks: int
+
+
+class IngestManifest:
+    """SQLite-backed record of every ingested file's size, mtime and content hash,
+    used to decide which files need re-parsing on the next run.
+    """
+
+    def __init__(self, db_path: str):
+        """Opens (and if necessary creates) the manifest database.
+
+        Args:
+            db_path: The path of the SQLite manifest file.
+
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "sha256 TEXT NOT NULL, chunks INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def entries_under(self, root: str) -> Dict[str, ManifestEntry]:
+        """Returns every manifest entry whose path lies inside `root`."""
+        prefix = root.rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        rows = self._conn.execute(
+            "SELECT path, size, mtime_ns, sha256, chunks FROM files "
+            "WHERE path >= ? AND path < ?",
+            (prefix, upper),
+        )
+        return {
+            row[0]: ManifestEntry(
+                path=row[0], size=row[1], mtime_ns=row[2], sha256=row[3], chunks=row[4]
+            )
+            for row in rows
+        }
+
+    def upsert(self, entries: List[ManifestEntry]):
+        """Records or refreshes the given entries in a single transaction."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, chunks) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(e.path, e.size, e.mtime_ns, e.sha256, e.chunks) for e in entries],
+            )
+
+    def remove(self, paths: List[str]):
+        """Forgets the given paths in a single transaction."""
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(p,) for p in paths]
+            )
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self._conn.close()
+
+
+def _walk_files(root: str) -> Iterator[Tuple[str, int, int]]:
+    """Yields (path, size, mtime_ns) for every regular file below `root`,
+    skipping hidden entries and well-known dependency/cache directories.
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or entry.name in SKIPPED_DIRS:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield entry.path, stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Skipping unreadable directory '{current}': {e}")
+
+
+@lru_cache(maxsize=1)
+def _get_splitter(
+    chunk_size: int, chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
+    """Returns a cached text splitter for the current worker process."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+
+
+def _extract_text(path: str, data: bytes) -> Optional[str]:
+    """Extracts text from raw file bytes, returning None for unsupported binaries."""
+    if path.lower().endswith(".pdf"):
+        reader = PdfReader(BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    if b"\x00" in data[:BINARY_SNIFF_BYTES]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def _parse_file(
+    path: str, chunk_size: int, chunk_overlap: int
+) -> Tuple[str, str, Optional[List[str]]]:
+    """Worker entry point: hashes a file and splits its text into chunks.
+
+    Returns:
+        A tuple of (path, sha256, chunks). `chunks` is None when the file is
+        binary or could not be parsed.
+
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return path, "", None
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        text = _extract_text(path, data)
+    except Exception:
+        return path, digest, None
+    if text is None:
+        return path, digest, None
+    return path, digest, _get_splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+class _IngestRun:
+    """State for a single ingestion run: pending chunks and manifest updates are
+    buffered here and flushed to Chroma and the manifest together.
+    """
+
+    def __init__(
+        self,
+        collection: chromadb.Collection,
+        manifest: IngestManifest,
+        batch_size: int,
+    ):
+        self.collection = collection
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.report = IngestReport()
+        self.known: Dict[str, ManifestEntry] = {}
+        self.stats: Dict[str, Tuple[int, int]] = {}
+        self._pending_entries: List[ManifestEntry] = []
+        self._pending_chunks: List[Tuple[str, str, dict]] = []
+
+    def scan(self, root: str) -> List[str]:
+        """Walks `root` and returns the files whose size or mtime changed."""
+        self.known = self.manifest.entries_under(root)
+        candidates: List[str] = []
+        for path, size, mtime_ns in _walk_files(root):
+            self.report.scanned += 1
+            self.stats[path] = (size, mtime_ns)
+            entry = self.known.get(path)
+            if entry and entry.size == size and entry.mtime_ns == mtime_ns:
+                self.report.unchanged += 1
+            else:
+                candidates.append(path)
+        return candidates
+
+    def remove_deleted(self):
+        """Drops the chunks and manifest entries of files that no longer exist."""
+        deleted = [path for path in self.known if path not in self.stats]
+        if not deleted:
+            return
+        for path in deleted:
+            self.collection.delete(where={"source": path})
+        self.manifest.remove(deleted)
+        self.report.removed = len(deleted)
+        logger.info(f"Removed chunks for {len(deleted)} deleted file(s).")
+
+    def apply(self, path: str, digest: str, chunks: Optional[List[str]]):
+        """Queues the outcome of parsing one file."""
+        if not digest:
+            self.report.skipped += 1
+            return
+        size, mtime_ns = self.stats[path]
+        previous = self.known.get(path)
+        self._pending_entries.append(
+            ManifestEntry(
+                path=path,
+                size=size,
+                mtime_ns=mtime_ns,
+                sha256=digest,
+                chunks=len(chunks) if chunks is not None else 0,
+            )
+        )
+        if chunks is None:
+            # Binaries are recorded too, so they are not re-read on the next run.
+            self.report.skipped += 1
+            if previous and previous.chunks:
+                self.collection.delete(where={"source": path})
+            return
+        if previous and previous.sha256 == digest:
+            # Touched but not modified: only the stat is refreshed.
+            self.report.unchanged += 1
+            return
+
+        if previous:
+            self.collection.delete(where={"source": path})
+            self.report.updated += 1
+        else:
+            self.report.added += 1
+        self._pending_chunks.extend(
+            (
+                f"{path}::{index}",
+                chunk,
+                {"source": path, "chunk": index, "sha256": digest},
+            )
+            for index, chunk in enumerate(chunks)
+        )
+        if len(self._pending_chunks) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Embeds pending chunks in batches, then records their files as ingested."""
+        chunks = self._pending_chunks
+        for start in range(0, len(chunks), self.batch_size):
+            batch = chunks[start : start + self.batch_size]
+            self.collection.upsert(
+                ids=[chunk_id for chunk_id, _, _ in batch],
+                documents=[document for _, document, _ in batch],
+                metadatas=[metadata for _, _, metadata in batch],
+            )
+        self.manifest.upsert(self._pending_entries)
+        self.report.chunks_embedded += len(chunks)
+        self._pending_chunks = []
+        self._pending_entries = []
+
+
+def tenant_manifest_path(manifest_path: str, collection_name: str) -> str:
+    """Returns the manifest that tracks the files of a tenant collection."""
+    path = Path(manifest_path)
+    return str(path.with_name(f"{path.stem}.{collection_name}{path.suffix}"))
+
+
+def ingest_directory(
+    root: str,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    manifest_path: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+) -> IngestReport:
+    """Incrementally ingests a directory tree into the knowledge base.
+
+    Files whose size and mtime match the manifest are skipped without being
+    read. Changed files are parsed in a process pool, and only those whose
+    content hash differs are re-embedded, in batches. Chunks belonging to files
+    that disappeared since the last run are removed.
+
+    Args:
+        root: The directory to ingest.
+        workers: Parser processes to use. Defaults to the configured value.
+        batch_size: Chunks per embedding request. Defaults to the configured value.
+        manifest_path: Overrides the configured manifest location.
+        tenant_id: The tenant whose knowledge base receives the files. Defaults
+            to the shared knowledge base.
+
+    Returns:
+        An `IngestReport` describing what changed.
+
+    """
+    settings = get_settings()
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"'{root}' is not a valid directory.")
+
+    started = time.perf_counter()
+    manifest_path = manifest_path or settings.ingest_manifest_path
+    if tenant_id:
+        # Each tenant collection tracks its own files.
+        manifest_path = tenant_manifest_path(
+            manifest_path, tenant_collection_name(tenant_id)
+        )
+    manifest = IngestManifest(manifest_path)
+    run = _IngestRun(
+        get_collection(tenant_id), manifest, batch_size or settings.ingest_batch_size
+    )
+    try:
+        candidates = run.scan(root)
+        run.remove_deleted()
+        logger.info(
+            f"Scanned {run.report.scanned} file(s); {len(candidates)} need parsing."
+        )
+        if candidates:
+            with ProcessPoolExecutor(
+                max_workers=workers or settings.ingest_workers
+            ) as pool:
+                results = pool.map(
+                    _parse_file,
+                    candidates,
+                    [settings.ingest_chunk_size] * len(candidates),
+                    [settings.ingest_chunk_overlap] * len(candidates),
+                    chunksize=16,
+                )
+                for path, digest, chunks in results:
+                    run.apply(path, digest, chunks)
+        run.flush()
+    finally:
+        manifest.close()
+
+    report = run.report
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    logger.success(f"Ingestion of '{root}' finished: {report.model_dump()}")
+    return report
@@ -0,0 +1,343 @@
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import chromadb
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+
+from valai.config import get_settings
+from valai.core.ingest import tenant_manifest_path
+from valai.tools.knowledge_tools import (
+    TENANT_COLLECTION_PREFIX,
+    drop_collection,
+    get_client,
+    get_collection,
+    get_embedding_function,
+    list_collection_names,
+)
+
+# Prefix of the documents BackgroundRAG stores for every conversation turn.
+CONVERSATION_PREFIX = "conv_"
+
+# Stored embeddings reused as probe queries when measuring latency.
+LATENCY_PROBES = 5
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+
+class MaintenanceReport(BaseModel):
+    """Before/after figures for a single maintenance run."""
+
+    size_before: int = 0
+    size_after: int = 0
+    query_latency_ms_before: Optional[float] = None
+    query_latency_ms_after: Optional[float] = None
+    expired: int = 0
+    evicted_over_cap: int = 0
+    duplicates_removed: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def _sample_probes(collection: chromadb.Collection) -> List[List[float]]:
+    """Returns a few stored embeddings to use as representative queries."""
+    sample = collection.get(limit=LATENCY_PROBES, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if embeddings is None:
+        return []
+    return [list(map(float, e)) for e in embeddings]
+
+
+def _measure_latency(
+    collection: chromadb.Collection, probes: List[List[float]]
+) -> Optional[float]:
+    """Returns the median latency, in milliseconds, of a top-5 query for each probe."""
+    count = collection.count()
+    if not probes or not count:
+        return None
+    timings = []
+    for probe in probes:
+        started = time.perf_counter()
+        collection.query(query_embeddings=[probe], n_results=min(5, count))
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def _delete(collection: chromadb.Collection, ids: List[str], batch_size: int):
+    """Deletes documents by ID in batches."""
+    for start in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[start : start + batch_size])
+
+
+def _conversation_ages(
+    collection: chromadb.Collection, batch_size: int
+) -> List[tuple[str, float]]:
+    """Returns (id, added_at) for every conversation document, newest first.
+    Documents stored before timestamps were recorded have an `added_at` of 0.
+    Metadata is read a page at a time, so memory does not grow with the
+    size of the collection's other documents.
+    """
+    ages = []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        metadatas = page.get("metadatas") or [None] * len(page["ids"])
+        ages.extend(
+            (doc_id, float((metadata or {}).get("added_at", 0.0)))
+            for doc_id, metadata in zip(page["ids"], metadatas)
+            if doc_id.startswith(CONVERSATION_PREFIX)
+        )
+        offset += len(page["ids"])
+    ages.sort(key=lambda item: item[1], reverse=True)
+    return ages
+
+
+class _KeptVectors:
+    """The canonical embeddings kept so far, stored in fixed-size blocks that
+    are allocated as they fill, so memory grows with the survivors a block at
+    a time rather than being reserved for every candidate up front.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self.blocks: List[np.ndarray] = []
+        self.filled = 0  # Rows used in the last block.
+
+    def max_similarity(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns each vector's highest similarity to a kept vector."""
+        best = np.full(len(vectors), -np.inf, dtype=np.float32)
+        for i, block in enumerate(self.blocks):
+            rows = block if i < len(self.blocks) - 1 else block[: self.filled]
+            if len(rows):
+                np.maximum(best, (vectors @ rows.T).max(axis=1), out=best)
+        return best
+
+    def extend(self, vectors: np.ndarray):
+        """Appends vectors, starting a new block whenever the last one is full."""
+        for vector in vectors:
+            if not self.blocks or self.filled == self.block_size:
+                self.blocks.append(
+                    np.empty((self.block_size, len(vector)), dtype=np.float32)
+                )
+                self.filled = 0
+            self.blocks[-1][self.filled] = vector
+            self.filled += 1
+
+
+def _find_near_duplicates(
+    collection: chromadb.Collection,
+    ids: List[str],
+    threshold: float,
+    batch_size: int,
+) -> List[str]:
+    """Finds documents whose embedding has cosine similarity of at least
+    `threshold` with an earlier document in `ids`.
+
+    Embeddings are fetched and compared a batch at a time: each batch is first
+    checked against the canonical documents kept so far, one matrix product per
+    block of them, then against itself. The first document of every cluster is
+    kept, so callers should pass `ids` in order of preference.
+    """
+    kept = _KeptVectors(batch_size)
+    duplicates: List[str] = []
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+        fetched = collection.get(ids=batch_ids, include=["embeddings"])
+        if not fetched["ids"]:
+            continue
+        # get() does not preserve the requested order, which decides the canonical.
+        position = {doc_id: i for i, doc_id in enumerate(fetched["ids"])}
+        batch_ids = [doc_id for doc_id in batch_ids if doc_id in position]
+        vectors = np.asarray(fetched["embeddings"], dtype=np.float32)[
+            [position[doc_id] for doc_id in batch_ids]
+        ]
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        is_duplicate = kept.max_similarity(vectors) >= threshold
+        within = vectors @ vectors.T
+        for i in range(len(vectors)):
+            if is_duplicate[i]:
+                continue
+            # Anything later in the batch that matches this survivor is a duplicate.
+            later = within[i, i + 1 :] >= threshold
+            is_duplicate[i + 1 :] |= later
+
+        kept.extend(vectors[~is_duplicate])
+        duplicates.extend(doc_id for doc_id, dup in zip(batch_ids, is_duplicate) if dup)
+    return duplicates
+
+
+def run_maintenance(
+    collection: Optional[chromadb.Collection] = None,
+    ttl_days: Optional[float] = None,
+    max_conversations: Optional[int] = None,
+    duplicate_threshold: Optional[float] = None,
+) -> MaintenanceReport:
+    """Compacts and prunes the conversation memory stored by BackgroundRAG.
+
+    Conversation documents older than the TTL are evicted first, then
+    near-duplicates are collapsed to their newest member, and finally the oldest
+    survivors are evicted until the count cap is met. Documents added by other
+    means (tools, `valai ingest`) are never touched.
+
+    Args:
+        collection: The collection to maintain. Defaults to the knowledge base.
+        ttl_days: Maximum age of a conversation document. 0 disables TTL eviction.
+        max_conversations: Maximum number of conversation documents. 0 disables the cap.
+        duplicate_threshold: Cosine similarity at which two documents are duplicates,
+            in (0, 1].
+
+    Returns:
+        A `MaintenanceReport` with collection size and query latency before and after.
+
+    Raises:
+        ValueError: If `duplicate_threshold` is not in (0, 1].
+
+    """
+    settings = get_settings()
+    collection = collection or get_collection()
+    ttl_days = (
+        settings.knowledge_conversation_ttl_days if ttl_days is None else ttl_days
+    )
+    max_conversations = (
+        settings.knowledge_max_conversations
+        if max_conversations is None
+        else max_conversations
+    )
+    if duplicate_threshold is None:
+        duplicate_threshold = settings.knowledge_duplicate_threshold
+    if not 0 < duplicate_threshold <= 1:
+        # Anything lower would treat unrelated memories as duplicates of each other.
+        raise ValueError(
+            f"duplicate_threshold must be in (0, 1], got {duplicate_threshold}"
+        )
+    batch_size = settings.knowledge_maintenance_batch_size
+
+    started = time.perf_counter()
+    report = MaintenanceReport(size_before=collection.count())
+    probes = _sample_probes(collection)
+    report.query_latency_ms_before = _measure_latency(collection, probes)
+
+    conversations = _conversation_ages(collection, batch_size)
+
+    if ttl_days:
+        cutoff = time.time() - ttl_days * 86400
+        # Undated documents have an unknown age, so only the count cap evicts them.
+        expired = {
+            doc_id for doc_id, added_at in conversations if 0 < added_at < cutoff
+        }
+        _delete(collection, list(expired), batch_size)
+        report.expired = len(expired)
+        conversations = [item for item in conversations if item[0] not in expired]
+
+    duplicates = _find_near_duplicates(
+        collection,
+        [doc_id for doc_id, _ in conversations],
+        duplicate_threshold,
+        batch_size,
+    )
+    _delete(collection, duplicates, batch_size)
+    report.duplicates_removed = len(duplicates)
+    removed = set(duplicates)
+    conversations = [item for item in conversations if item[0] not in removed]
+
+    if max_conversations and len(conversations) > max_conversations:
+        over_cap = [doc_id for doc_id, _ in conversations[max_conversations:]]
+        _delete(collection, over_cap, batch_size)
+        report.evicted_over_cap = len(over_cap)
+
+    report.size_after = collection.count()
+    report.query_latency_ms_after = _measure_latency(collection, probes)
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    logger.success(f"Knowledge base maintenance finished: {report.model_dump()}")
+    return report
+
+
+def prune_idle_tenants(idle_days: Optional[float] = None) -> List[str]:
+    """Deletes tenant collections, and their ingest manifests, that have not
+    been used for `idle_days`. Collections created before use was recorded are
+    stamped now, so they get a full idle period before being pruned.
+
+    Returns:
+        The names of the deleted collections.
+
+    """
+    settings = get_settings()
+    if idle_days is None:
+        idle_days = settings.knowledge_tenant_idle_days
+    if not idle_days:
+        return []
+
+    now = time.time()
+    cutoff = now - idle_days * 86400
+    pruned = []
+    for collection in get_client().list_collections():
+        if not collection.name.startswith(TENANT_COLLECTION_PREFIX):
+            continue
+        metadata = dict(collection.metadata or {})
+        last_used = metadata.get("last_used")
+        if last_used is None:
+            collection.modify(metadata={**metadata, "last_used": now})
+        elif last_used < cutoff:
+            drop_collection(collection.name)
+            manifest = tenant_manifest_path(
+                settings.ingest_manifest_path, collection.name
+            )
+            if os.path.exists(manifest):
+                os.remove(manifest)
+            pruned.append(collection.name)
+    if pruned:
+        logger.info(
+            f"Deleted {len(pruned)} tenant collection(s) idle for {idle_days} day(s)."
+        )
+    return pruned
+
+
+def run_maintenance_for_all(**limits: Any) -> Dict[str, MaintenanceReport]:
+    """Deletes idle tenant collections, then runs maintenance on the shared
+    knowledge base and on every remaining tenant collection, returning a report
+    per collection name. `limits` are passed through to `run_maintenance`.
+    """
+    prune_idle_tenants()
+    client = get_client()
+    reports = {}
+    for name in list_collection_names():
+        collection = client.get_collection(
+            name=name, embedding_function=get_embedding_function()
+        )
+        reports[name] = run_maintenance(collection, **limits)
+    return reports
+
+
+def start_maintenance_scheduler():
+    """Starts a daemon thread that runs maintenance every
+    `knowledge_maintenance_interval_hours`. Does nothing if the interval is 0
+    or the scheduler is already running in this process.
+    """
+    global _scheduler_started
+    interval_hours = get_settings().knowledge_maintenance_interval_hours
+    if not interval_hours:
+        return
+
+    with _scheduler_lock:
+        if _scheduler_started:
+            return
+        _scheduler_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval_hours * 3600)
+            try:
+                run_maintenance_for_all()
+            except Exception as e:
+                logger.error(f"Scheduled knowledge base maintenance failed: {e}")
+
+    thread = threading.Thread(target=loop, name="valai-kb-maintenance", daemon=True)
+    thread.start()
+    logger.info(f"Knowledge base maintenance scheduled every {interval_hours} hour(s).")
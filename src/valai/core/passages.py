@@ -0,0 +1,114 @@
+import math
+import re
+from collections import Counter
+from typing import Iterator, List
+
+from pydantic import BaseModel
+
+from valai.core.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Okapi BM25 parameters: term-frequency saturation and length normalization.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Words too common to say anything about relevance.
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "why", "will", "with",
+}  # fmt: skip
+
+
+class Passage(BaseModel):
+    """A short piece of a source document, scored against a query."""
+
+    text: str
+    source: int
+    score: float = 0.0
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase terms, dropping stopwords."""
+    return [
+        word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS
+    ]
+
+
+def _pieces(text: str, max_tokens: int) -> Iterator[str]:
+    """Yields the lines of `text`, with lines longer than `max_tokens` split at
+    sentence ends (and overlong sentences into chunks).
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) <= max_tokens:
+            yield line
+            continue
+        width = max_tokens * CHARS_PER_TOKEN
+        for sentence in SENTENCE_END_PATTERN.split(line):
+            for start in range(0, len(sentence), width):
+                yield sentence[start : start + width]
+
+
+def split_passages(text: str, source: int, max_tokens: int = 150) -> List[Passage]:
+    """Splits extracted page text into passages of about `max_tokens`.
+
+    Lines are grouped until a passage is full, and a Markdown heading always
+    starts a new passage, which keeps it as context for the text below it.
+
+    Args:
+        text: The page text, as returned by `extract_main_content`.
+        source: The number of the source the text came from.
+        max_tokens: Approximate size of a passage.
+
+    Returns:
+        The passages, in document order.
+
+    """
+    passages: List[Passage] = []
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(text, max_tokens):
+        tokens = estimate_tokens(piece)
+        if current and (piece.startswith("#") or size + tokens > max_tokens):
+            passages.append(Passage(text="\n".join(current), source=source))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        passages.append(Passage(text="\n".join(current), source=source))
+    # A passage that is only a heading carries nothing to rank.
+    return [p for p in passages if not (p.text.startswith("#") and "\n" not in p.text)]
+
+
+def rank_passages(query: str, passages: List[Passage]) -> List[Passage]:
+    """Scores passages against a query with BM25 and returns those matching at
+    least one query term, best first.
+    """
+    terms = set(tokenize(query))
+    documents = [Counter(tokenize(passage.text)) for passage in passages]
+    if not terms or not documents:
+        return []
+    average_length = sum(sum(d.values()) for d in documents) / len(documents) or 1.0
+    frequencies = {term: sum(term in d for d in documents) for term in terms}
+    idf = {
+        term: math.log(1 + (len(documents) - count + 0.5) / (count + 0.5))
+        for term, count in frequencies.items()
+    }
+
+    ranked = []
+    for passage, document in zip(passages, documents):
+        length = sum(document.values())
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+        score = sum(
+            idf[term] * document[term] * (BM25_K1 + 1) / (document[term] + norm)
+            for term in terms
+            if document[term]
+        )
+        if score > 0:
+            ranked.append(passage.model_copy(update={"score": score}))
+    return sorted(ranked, key=lambda passage: passage.score, reverse=True)
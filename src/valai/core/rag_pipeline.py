@@ -1,3 +1,5 @@
+import contextvars
+import hashlib
 import threading
 
 from loguru import logger
@@ -49,8 +51,10 @@ class BackgroundRAG:
                 f"User Question: {user_msg}\n\nAssistant's Answer: {assistant_msg}"
             )
 
-            # Use a hash of the content for a deterministic ID
-            doc_id = f"conv_{hash(document_content)}"
+            # Use a digest of the content for a deterministic ID. The builtin
+            # hash() is salted per process, so repeated turns would not collide.
+            digest = hashlib.sha1(document_content.encode("utf-8")).hexdigest()
+            doc_id = f"conv_{digest}"
 
             logger.info(
                 f"Embedding conversation turn (ID: {doc_id}) into knowledge base."
@@ -66,7 +70,12 @@ class BackgroundRAG:
         """Starts the embedding process in a non-blocking background thread."""
         history_copy = conversation_history
 
-        thread = threading.Thread(target=self._process_and_embed, args=(history_copy,))
+        # Run in a copy of the current context so the turn is stored in the
+        # knowledge base of the tenant that produced it.
+        context = contextvars.copy_context()
+        thread = threading.Thread(
+            target=context.run, args=(self._process_and_embed, history_copy)
+        )
         thread.daemon = True
         thread.start()
 
@@ -0,0 +1,478 @@
+import asyncio
+import json
+import signal
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import psutil
+from loguru import logger
+from pydantic import BaseModel
+
+from valai.config import get_settings
+from valai.core.status import report_status
+from valai.core.tenancy import current_conversation, current_tenant
+
+WORKER_SCRIPT = Path(__file__).with_name("sandbox_worker.py")
+
+# Upper bound on one protocol line; output arrives in bounded chunks.
+REPLY_LIMIT_BYTES = 16 * 1024 * 1024
+
+# Streamed output is relayed to the UI at most this often, this much at a time.
+STATUS_INTERVAL_SECONDS = 1.0
+STATUS_MAX_CHARS = 300
+
+# How often a running snippet's CPU time is checked against its budget.
+CPU_CHECK_INTERVAL_SECONDS = 0.1
+
+# Who a pooled worker ran code for: a (tenant, conversation) pair.
+Owner = Tuple[Optional[str], Optional[str]]
+
+# Worker pools and sessions are bound to the event loop they were created on.
+_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_session_managers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+class ExecutionResult(BaseModel):
+    """The outcome of running a snippet in a worker process."""
+
+    ok: bool
+    # Output, cut down to its head and tail when it exceeded the caps.
+    stdout: str = ""
+    stderr: str = ""
+    # Total output size, including anything cut.
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+    truncated: bool = False
+    # Why the run was stopped from outside (timeout, resource limit, crash).
+    error: Optional[str] = None
+
+
+class _OutputCapture:
+    """Collects the head of a run's output as the worker streams it, and
+    relays new output to the UI as status updates while the code runs.
+    """
+
+    def __init__(self, head_bytes: int):
+        self.head_bytes = head_bytes
+        self.head: Dict[str, List[str]] = {"stdout": [], "stderr": []}
+        self.received = {"stdout": 0, "stderr": 0}
+        self.truncated = False
+        self._unreported = ""
+        self._last_report = 0.0
+
+    def add(self, stream: str, data: str):
+        if self.received[stream] < self.head_bytes:
+            self.head[stream].append(data[: self.head_bytes - self.received[stream]])
+        self.received[stream] += len(data.encode("utf-8", errors="replace"))
+        self._unreported = (self._unreported + data)[-STATUS_MAX_CHARS:]
+        now = time.monotonic()
+        if now - self._last_report >= STATUS_INTERVAL_SECONDS:
+            report_status(f"🐍 {self._unreported.strip()}")
+            self._unreported = ""
+            self._last_report = now
+
+    def text(self, stream: str, tail: str = "", total_bytes: int = 0) -> str:
+        """Joins the head and tail of a stream, marking what was left out."""
+        head = "".join(self.head[stream])
+        omitted = total_bytes - len(head.encode("utf-8", errors="replace"))
+        omitted -= len(tail.encode("utf-8", errors="replace"))
+        if omitted <= 0:
+            return head + tail
+        self.truncated = True
+        return f"{head}\n[... {omitted:,} bytes of output omitted ...]\n{tail}"
+
+    def partial_result(self, error: str) -> ExecutionResult:
+        """Describes a run that was stopped, with the output it produced so far."""
+        return ExecutionResult(
+            ok=False,
+            stdout=self.text("stdout"),
+            stderr=self.text("stderr"),
+            stdout_bytes=self.received["stdout"],
+            stderr_bytes=self.received["stderr"],
+            truncated=any(size >= self.head_bytes for size in self.received.values()),
+            error=error,
+        )
+
+
+def _describe_exit(returncode: Optional[int]) -> str:
+    """Explains why a worker process died while running code."""
+    if returncode == -getattr(signal, "SIGKILL", 0):
+        return "The process was killed, probably for using too much memory."
+    return f"The interpreter process exited unexpectedly (code {returncode})."
+
+
+class _Worker:
+    """A warm interpreter process that runs one snippet at a time."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.executions = 0
+        self.busy = False
+        # Set once a run leaves state behind that later runs could observe.
+        self.tainted = False
+        self.owner: Optional[Owner] = None
+        self.cpu_exceeded = False
+
+    @classmethod
+    async def start(cls, memory_limit_mb: Optional[int] = None) -> "_Worker":
+        """Starts a worker and waits until its modules are preloaded."""
+        memory_limit_mb = memory_limit_mb or get_settings().code_memory_limit_mb
+        memory_bytes = memory_limit_mb * 1024 * 1024
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            str(WORKER_SCRIPT),
+            str(memory_bytes),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=REPLY_LIMIT_BYTES,
+        )
+        worker = cls(process)
+        try:
+            await worker._receive()
+        except BaseException:
+            worker.kill()
+            raise
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def _receive(self) -> dict:
+        """Reads the next reply. Raises EOFError if the process is gone."""
+        line = await self.process.stdout.readline()
+        if not line:
+            raise EOFError("worker exited")
+        return json.loads(line)
+
+    async def _collect(self, capture: _OutputCapture, timeout: float) -> dict:
+        """Reads streamed output into `capture` until the final reply arrives.
+
+        Raises:
+            asyncio.TimeoutError: If the reply is not in within `timeout` seconds.
+            EOFError: If the process died.
+
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = max(0.0, deadline - loop.time())
+            message = await asyncio.wait_for(self._receive(), timeout=remaining)
+            if "output" not in message:
+                return message
+            capture.add(message["output"], message["data"])
+
+    def _cpu_time(self) -> float:
+        times = psutil.Process(self.process.pid).cpu_times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    async def _enforce_cpu(self, budget: float):
+        """Kills the process once the current run has used `budget` seconds of
+        CPU. This runs in the parent, so the code cannot lift the limit.
+        """
+        try:
+            start = self._cpu_time()
+            while self.alive:
+                await asyncio.sleep(CPU_CHECK_INTERVAL_SECONDS)
+                if self._cpu_time() - start >= budget:
+                    self.cpu_exceeded = True
+                    self.kill()
+                    return
+        except psutil.Error:
+            return  # The process is gone.
+
+    async def run(self, code: str, persistent: bool = False) -> ExecutionResult:
+        """Runs a snippet, enforcing the wall-clock timeout. A worker that
+        times out or dies is not usable afterwards. Output is streamed back
+        and capped: past `code_output_head_bytes`, only the last
+        `code_output_tail_bytes` of each stream are kept.
+
+        Args:
+            code: The Python source to run.
+            persistent: Run in the worker's long-lived namespace instead of a
+                fresh one, keeping what earlier persistent runs defined.
+
+        """
+        settings = get_settings()
+        self.executions += 1
+        self.busy = True
+        request = {
+            "code": code,
+            "persistent": persistent,
+            "head_bytes": settings.code_output_head_bytes,
+            "tail_bytes": settings.code_output_tail_bytes,
+        }
+        capture = _OutputCapture(settings.code_output_head_bytes)
+        watchdog = None
+        if settings.code_cpu_seconds > 0:
+            watchdog = asyncio.ensure_future(
+                self._enforce_cpu(settings.code_cpu_seconds)
+            )
+        try:
+            self.process.stdin.write(json.dumps(request).encode() + b"\n")
+            await self.process.stdin.drain()
+            reply = await self._collect(capture, settings.code_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.kill()
+            return capture.partial_result(
+                "Code execution timed out after "
+                f"{settings.code_timeout_seconds:g} seconds."
+            )
+        except (EOFError, ConnectionError):
+            returncode = await self.process.wait()
+            if self.cpu_exceeded:
+                return capture.partial_result(
+                    f"CPU time limit of {settings.code_cpu_seconds} seconds exceeded."
+                )
+            return capture.partial_result(_describe_exit(returncode))
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        self.busy = False
+        if reply.get("threads_left"):
+            # Left-over threads would keep running, and printing, in later runs.
+            self.tainted = True
+        return ExecutionResult(
+            ok=reply["ok"],
+            stdout=capture.text("stdout", reply["stdout_tail"], reply["stdout_bytes"]),
+            stderr=capture.text("stderr", reply["stderr_tail"], reply["stderr_bytes"]),
+            stdout_bytes=reply["stdout_bytes"],
+            stderr_bytes=reply["stderr_bytes"],
+            truncated=capture.truncated,
+        )
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+
+
+class WorkerPool:
+    """Keeps up to `size` interpreter processes warm and runs snippets on them.
+
+    Each run gets a fresh namespace, but a snippet can still change the
+    process (imported modules, os.environ, the working directory), so a
+    worker only ever runs code for one tenant and conversation. Workers are
+    replaced after `code_worker_max_executions` runs, when a run leaves
+    threads behind, when another owner needs the slot, or as soon as one
+    times out, crashes or hits a resource limit. Replacements start in the
+    background, so callers rarely wait for interpreter startup.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: List[_Worker] = []
+        self._starting: Set[asyncio.Task] = set()
+        self._busy = 0
+        self._slots = asyncio.Semaphore(size)
+
+    def warm(self):
+        """Starts workers in the background until `size` of them are available."""
+        while len(self._idle) + len(self._starting) + self._busy < self.size:
+            task = asyncio.ensure_future(_Worker.start())
+            self._starting.add(task)
+            task.add_done_callback(self._started)
+
+    def _started(self, task: asyncio.Task):
+        self._starting.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"Could not start a code worker: {task.exception()}")
+            return
+        self._idle.append(task.result())
+
+    def _pick(self, owner: Owner) -> Optional[_Worker]:
+        """Removes and returns an idle worker that already ran code for
+        `owner`, or else an unused one.
+        """
+        self._idle = [worker for worker in self._idle if worker.alive]
+        for wanted in (owner, None):
+            for index, worker in enumerate(self._idle):
+                if worker.owner == wanted:
+                    return self._idle.pop(index)
+        return None
+
+    async def _take(self, owner: Owner) -> _Worker:
+        """Returns an idle worker `owner` may use, waiting for one being
+        started if needed. A worker used by someone else is retired to make
+        room for a fresh one.
+        """
+        while True:
+            worker = self._pick(owner)
+            if worker is not None:
+                worker.owner = owner
+                return worker
+            if self._idle:
+                self._idle.pop(0).kill()
+                self.warm()
+            if not self._starting:
+                worker = await _Worker.start()
+                worker.owner = owner
+                return worker
+            await asyncio.wait(self._starting, return_when=asyncio.FIRST_COMPLETED)
+
+    def _release(self, worker: _Worker):
+        """Returns a worker to the pool, or retires it if it is spent or broken."""
+        max_executions = get_settings().code_worker_max_executions
+        if (
+            worker.busy
+            or worker.tainted
+            or not worker.alive
+            or worker.executions >= max_executions
+        ):
+            worker.kill()
+        else:
+            self._idle.append(worker)
+        self.warm()
+
+    async def close(self):
+        """Stops every worker, including those still starting."""
+        for task in self._starting:
+            task.cancel()
+        workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.kill()
+            await worker.process.wait()
+
+    async def run(self, code: str) -> ExecutionResult:
+        """Runs a snippet on a warm worker of the current tenant and conversation."""
+        owner = (current_tenant.get(), current_conversation.get())
+        async with self._slots:
+            worker = await self._take(owner)
+            self._busy += 1
+            try:
+                return await worker.run(code)
+            finally:
+                self._busy -= 1
+                self._release(worker)
+
+
+def get_worker_pool() -> WorkerPool:
+    """Returns the code worker pool for the running event loop, warming it up
+    on first use.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = WorkerPool(get_settings().code_pool_size)
+        pool.warm()
+    return pool
+
+
+class _Session:
+    """A conversation's interpreter; the lock serializes its runs."""
+
+    def __init__(self):
+        self.worker: Optional[_Worker] = None
+        self.lock = asyncio.Lock()
+        self.expiry: Optional[asyncio.TimerHandle] = None
+
+
+class SessionManager:
+    """Gives each conversation its own long-lived interpreter, whose variables,
+    imports and functions survive between runs.
+
+    A session is closed after `code_session_idle_seconds` without use, when more
+    than `code_max_sessions` are open (least recently used first), on an
+    explicit reset, or when a run times out, crashes or hits a resource limit.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def _get(self, key: str) -> _Session:
+        """Returns the session for `key`, creating it and evicting the least
+        recently used ones beyond the cap.
+        """
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _Session()
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > get_settings().code_max_sessions:
+            evicted_key, evicted = self._sessions.popitem(last=False)
+            logger.info(f"Closing Python session '{evicted_key}' (too many open).")
+            self._close(evicted)
+        return session
+
+    def _close(self, session: _Session):
+        if session.expiry is not None:
+            session.expiry.cancel()
+        if session.worker is not None:
+            session.worker.kill()
+            session.worker = None
+
+    def _expire(self, key: str, session: _Session):
+        """Closes a session that has been idle for too long."""
+        if session.lock.locked():
+            self._schedule_expiry(key, session)
+            return
+        if self._sessions.get(key) is session:
+            del self._sessions[key]
+        self._close(session)
+        logger.info(f"Closed idle Python session '{key}'.")
+
+    def _schedule_expiry(self, key: str, session: _Session):
+        if session.expiry is not None:
+            session.expiry.cancel()
+        session.expiry = asyncio.get_running_loop().call_later(
+            get_settings().code_session_idle_seconds, self._expire, key, session
+        )
+
+    async def run(self, key: str, code: str) -> ExecutionResult:
+        """Runs a snippet in the session for `key`, starting it if needed."""
+        session = self._get(key)
+        async with session.lock:
+            if session.worker is None or not session.worker.alive:
+                session.worker = await _Worker.start(
+                    get_settings().code_session_memory_limit_mb
+                )
+            result = await session.worker.run(code, persistent=True)
+            if result.error:
+                # The interpreter is gone, and its state with it.
+                self._close(session)
+                result.error += " The session was reset and its variables are lost."
+        self._schedule_expiry(key, session)
+        return result
+
+    def reset(self, key: str) -> bool:
+        """Closes the session for `key`. Returns whether there was one."""
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return False
+        self._close(session)
+        return True
+
+    async def close(self):
+        """Closes every session."""
+        sessions, self._sessions = self._sessions, OrderedDict()
+        for session in sessions.values():
+            worker = session.worker
+            self._close(session)
+            if worker is not None:
+                await worker.process.wait()
+
+
+def get_session_manager() -> SessionManager:
+    """Returns the Python session manager for the running event loop."""
+    loop = asyncio.get_running_loop()
+    manager = _session_managers.get(loop)
+    if manager is None:
+        manager = _session_managers[loop] = SessionManager()
+    return manager
+
+
+async def close_worker_pool():
+    """Stops the running event loop's code workers, sessions included."""
+    loop = asyncio.get_running_loop()
+    manager = _session_managers.pop(loop, None)
+    if manager is not None:
+        await manager.close()
+    pool = _pools.pop(loop, None)
+    if pool is not None:
+        await pool.close()
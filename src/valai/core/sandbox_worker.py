@@ -0,0 +1,225 @@
+"""Interpreter process for run_python_code, driven by valai.core.sandbox.
+
+It is started as a plain script, so it imports nothing from valai and only
+pays for the standard library. Requests arrive on stdin and replies leave on
+stdout, one JSON object per line; the code being run gets neither stream.
+Each snippet gets a fresh namespace, with its own copy of the builtins,
+unless the request asks for the persistent one kept by a session. CPU time
+is limited by the parent, which watches the process from outside.
+
+While a snippet runs, the start of its output is streamed back as
+{"output": stream, "data": text} messages; past `head_bytes` only the last
+`tail_bytes` are kept, and they travel in the final reply.
+"""
+
+import builtins
+import io
+import json
+import linecache
+import os
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: memory is not limited.
+    resource = None
+
+# Imported once per worker, so snippets that use them start instantly.
+PRELOADED_MODULES = [
+    "collections",
+    "csv",
+    "datetime",
+    "decimal",
+    "fractions",
+    "functools",
+    "itertools",
+    "json",
+    "math",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "textwrap",
+]
+
+CODE_FILENAME = "<code>"
+
+# Streamed output is sent at least this often, or as soon as this much is pending.
+FLUSH_INTERVAL_SECONDS = 0.2
+FLUSH_THRESHOLD_CHARS = 8192
+
+
+def _limit_memory(memory_bytes):
+    """Caps the address space of this process."""
+    if resource is not None and memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+class _Channel:
+    """The reply stream, shared by the main thread and the flusher thread."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.pending = {"stdout": [], "stderr": []}
+        self.pending_chars = 0
+
+    def send(self, message):
+        with self.lock:
+            self.stream.write(json.dumps(message) + "\n")
+            self.stream.flush()
+
+    def queue(self, name, text):
+        """Queues streamed output, sending it right away once enough is pending."""
+        with self.lock:
+            self.pending[name].append(text)
+            self.pending_chars += len(text)
+        if self.pending_chars >= FLUSH_THRESHOLD_CHARS:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            for name, chunks in self.pending.items():
+                if chunks:
+                    message = {"output": name, "data": "".join(chunks)}
+                    self.stream.write(json.dumps(message) + "\n")
+                    chunks.clear()
+            self.pending_chars = 0
+            self.stream.flush()
+
+    def flush_periodically(self):
+        """Body of the flusher thread, so output shows up while code runs."""
+        event = threading.Event()
+        while not event.wait(FLUSH_INTERVAL_SECONDS):
+            self.flush()
+
+
+class _Capture(io.TextIOBase):
+    """Replaces stdout or stderr while a snippet runs. The first `head_bytes`
+    are streamed to the parent; after that only the last `tail_bytes` are
+    kept, so a runaway print loop uses bounded memory.
+    """
+
+    def __init__(self, name, channel, head_bytes, tail_bytes):
+        self.name = name
+        self.channel = channel
+        self.head_left = head_bytes
+        self.tail_bytes = tail_bytes
+        self.tail = []
+        self.tail_chars = 0
+        self.total_bytes = 0
+        # Set once the run is over; threads it left behind are silenced.
+        self.finished = False
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if self.finished:
+            return len(text)
+        # This runs for every print(), so the common cases stay cheap.
+        is_ascii = text.isascii()
+        size = len(text) if is_ascii else len(text.encode("utf-8", errors="replace"))
+        self.total_bytes += size
+        if self.head_left > 0:
+            if size <= self.head_left:
+                head = text
+            elif is_ascii:
+                head = text[: self.head_left]
+            else:
+                encoded = text.encode("utf-8", errors="replace")[: self.head_left]
+                head = encoded.decode("utf-8", errors="ignore")
+            self.head_left -= min(size, self.head_left)
+            self.channel.queue(self.name, head)
+            if len(head) == len(text):
+                return len(text)
+            self.tail.append(text[len(head) :])
+        else:
+            self.tail.append(text)
+        self.tail_chars += len(self.tail[-1])
+        if self.tail_chars > 2 * self.tail_bytes + 4096:
+            self.tail = [self.tail_text()]
+            self.tail_chars = len(self.tail[0])
+        return len(text)
+
+    def tail_text(self):
+        text = "".join(self.tail)
+        return text[-self.tail_bytes :] if self.tail_bytes > 0 else ""
+
+
+def _new_namespace():
+    # A copy, so that replacing a builtin does not leak into later snippets.
+    return {"__name__": "__main__", "__builtins__": dict(vars(builtins))}
+
+
+def _execute(channel, request, namespace):
+    """Runs one snippet in `namespace` and returns its reply."""
+    code = request["code"]
+    head_bytes = request.get("head_bytes", 16000)
+    tail_bytes = request.get("tail_bytes", 4000)
+    stdout = _Capture("stdout", channel, head_bytes, tail_bytes)
+    stderr = _Capture("stderr", channel, head_bytes, tail_bytes)
+    # Lets tracebacks show the offending source lines.
+    linecache.cache[CODE_FILENAME] = (len(code), None, code.splitlines(True), "")
+    ok = True
+    threads = threading.active_count()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            exec(compile(code, CODE_FILENAME, "exec"), namespace)
+        except SystemExit as e:
+            ok = e.code in (None, 0)
+            if not ok:
+                print(f"SystemExit: {e.code}", file=sys.stderr)
+        except BaseException as e:
+            ok = False
+            # Leave this function's frame out of the traceback.
+            tb = e.__traceback__.tb_next if e.__traceback__ else None
+            stderr.write("".join(traceback.format_exception(type(e), e, tb)))
+    stdout.finished = stderr.finished = True
+    channel.flush()
+    return {
+        "ok": ok,
+        "stdout_tail": stdout.tail_text(),
+        "stderr_tail": stderr.tail_text(),
+        "stdout_bytes": stdout.total_bytes,
+        "stderr_bytes": stderr.total_bytes,
+        # Threads the snippet started and left running.
+        "threads_left": max(0, threading.active_count() - threads),
+    }
+
+
+def main():
+    # Keep private copies of the protocol streams, and point fds 0 and 1 at
+    # /dev/null so that nothing the code does can corrupt them.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    channel = _Channel(os.fdopen(os.dup(1), "w", encoding="utf-8"))
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = io.StringIO()
+
+    _limit_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    for name in PRELOADED_MODULES:
+        __import__(name)
+
+    threading.Thread(target=channel.flush_periodically, daemon=True).start()
+    channel.send({"ready": True})
+    # Persistent requests share this namespace, so a session keeps its state.
+    session = _new_namespace()
+    for line in requests:
+        request = json.loads(line)
+        namespace = session if request.get("persistent") else _new_namespace()
+        channel.send(_execute(channel, request, namespace))
+
+
+if __name__ == "__main__":
+    main()
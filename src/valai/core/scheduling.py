@@ -0,0 +1,151 @@
+import datetime
+import os
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+
+Interval = Tuple[float, float]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sorts intervals and merges the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class BusyIndex:
+    """Busy time as sorted, non-overlapping intervals, so the free time in any
+    range is found with a binary search and a walk over the busy intervals
+    inside it, instead of comparing every event with every other.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self.busy = merge_intervals(intervals)
+        self._ends = [end for _, end in self.busy]
+
+    def busy_between(self, start: float, end: float) -> List[Interval]:
+        """Returns the busy intervals overlapping [start, end), clipped to it."""
+        overlapping = []
+        for busy_start, busy_end in self.busy[bisect_right(self._ends, start) :]:
+            if busy_start >= end:
+                break
+            overlapping.append((max(busy_start, start), min(busy_end, end)))
+        return overlapping
+
+    def free_between(self, start: float, end: float) -> List[Interval]:
+        """Returns the free intervals within [start, end)."""
+        free = []
+        cursor = start
+        for busy_start, busy_end in self.busy_between(start, end):
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+
+def _zoneinfo_key(path: str) -> Optional[str]:
+    """Returns the IANA name of a zoneinfo file path, e.g. 'Europe/Berlin'."""
+    _, found, key = path.partition("/zoneinfo/")
+    return key if found and key else None
+
+
+def _local_zone_name() -> Optional[str]:
+    """Finds the IANA name of the system time zone: the TZ variable, else the
+    zoneinfo file /etc/localtime links to, else /etc/timezone.
+    """
+    name = os.environ.get("TZ", "").lstrip(":")
+    if name:
+        return _zoneinfo_key(name) if name.startswith("/") else name
+    key = _zoneinfo_key(os.path.realpath("/etc/localtime"))
+    if key:
+        return key
+    try:
+        with open("/etc/timezone", "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve_timezone(name: Optional[str]) -> datetime.tzinfo:
+    """Returns the named IANA time zone, or the system's local one. The local
+    zone is looked up by name, so its daylight saving rules apply; only when
+    it has none does this fall back to the current, fixed UTC offset.
+
+    Raises:
+        ValueError: If the name is not a known time zone.
+
+    """
+    if not name:
+        local = _local_zone_name()
+        try:
+            return ZoneInfo(local) if local else _fixed_local_offset()
+        except (KeyError, ValueError, OSError):
+            # e.g. a POSIX rule string such as TZ=CET-1CEST.
+            return _fixed_local_offset()
+    try:
+        return ZoneInfo(name)
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"unknown time zone '{name}'") from e
+
+
+def _fixed_local_offset() -> datetime.tzinfo:
+    logger.warning(
+        "Could not determine the system's IANA time zone; using its current UTC "
+        "offset, which ignores daylight saving. Set CALENDAR_TIMEZONE to fix this."
+    )
+    return datetime.datetime.now().astimezone().tzinfo
+
+
+def working_windows(
+    start: float,
+    end: float,
+    tz: datetime.tzinfo,
+    day_start: datetime.time,
+    day_end: datetime.time,
+    include_weekends: bool = False,
+) -> List[Interval]:
+    """Returns the working hours of each day between `start` and `end`, in `tz`
+    and clipped to the range. Days are built from local wall-clock times, so
+    daylight saving changes are handled.
+    """
+    windows = []
+    day = datetime.datetime.fromtimestamp(start, tz).date()
+    last_day = datetime.datetime.fromtimestamp(end, tz).date()
+    while day <= last_day:
+        if include_weekends or day.weekday() < 5:
+            opens = datetime.datetime.combine(day, day_start, tzinfo=tz).timestamp()
+            closes = datetime.datetime.combine(day, day_end, tzinfo=tz).timestamp()
+            if max(opens, start) < min(closes, end):
+                windows.append((max(opens, start), min(closes, end)))
+        day += datetime.timedelta(days=1)
+    return windows
+
+
+def find_free_slots(
+    index: BusyIndex,
+    windows: List[Interval],
+    duration_seconds: float,
+    max_slots: Optional[int] = None,
+) -> List[Interval]:
+    """Returns the free stretches within `windows` that are at least
+    `duration_seconds` long, earliest first.
+    """
+    slots = []
+    for window_start, window_end in windows:
+        for free_start, free_end in index.free_between(window_start, window_end):
+            if free_end - free_start >= duration_seconds:
+                slots.append((free_start, free_end))
+                if max_slots is not None and len(slots) >= max_slots:
+                    return slots
+    return slots
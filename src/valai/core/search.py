@@ -0,0 +1,235 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, TypeVar
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from duckduckgo_search import DDGS
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter
+from tavily import TavilyClient
+
+from valai.config import get_settings
+from valai.core import search_cache
+from valai.core.executors import get_executor, run_blocking
+
+T = TypeVar("T")
+
+# Query parameters that only track the visitor and never change the page.
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "ref_src", "mc_cid", "mc_eid"}
+
+# Provider calls run on their own small pool, so a slow provider cannot starve
+# other blocking work.
+SEARCH_WORKERS = 4
+
+_ddg = threading.local()
+
+
+class SearchResult(BaseModel):
+    """A search hit, normalized across providers."""
+
+    title: str
+    url: str
+    snippet: str
+    provider: str
+
+
+_results_adapter = TypeAdapter(List[SearchResult])
+
+
+@lru_cache(maxsize=4)
+def _tavily_client(api_key: str) -> TavilyClient:
+    """Returns a reusable Tavily client, so its HTTP session is kept alive."""
+    return TavilyClient(api_key=api_key)
+
+
+def _ddg_client() -> DDGS:
+    """Returns this thread's DuckDuckGo client, reused across searches."""
+    client = getattr(_ddg, "client", None)
+    if client is None:
+        client = _ddg.client = DDGS()
+    return client
+
+
+def _tavily_search(query: str, max_results: int) -> List[SearchResult]:
+    """Searches with Tavily. Raises if the API key is missing or the call fails."""
+    api_key = get_settings().tavily_api_key
+    if not api_key:
+        raise RuntimeError("Tavily API key is not configured")
+    response = _tavily_client(api_key).search(query=query, max_results=max_results)
+    return [
+        SearchResult(
+            title=item.get("title") or "",
+            url=item.get("url") or "",
+            snippet=item.get("content") or "",
+            provider="tavily",
+        )
+        for item in response.get("results", [])
+    ]
+
+
+def _ddg_search(query: str, max_results: int) -> List[SearchResult]:
+    """Searches with DuckDuckGo. Raises if the call fails."""
+    return [
+        SearchResult(
+            title=item.get("title") or "",
+            url=item.get("href") or "",
+            snippet=item.get("body") or "",
+            provider="duckduckgo",
+        )
+        for item in _ddg_client().text(query, max_results=max_results)
+    ]
+
+
+# Providers in order of preference: on merge, earlier providers win ties.
+PROVIDERS: Dict[str, Callable[[str, int], List[SearchResult]]] = {
+    "tavily": _tavily_search,
+    "duckduckgo": _ddg_search,
+}
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes a URL for duplicate detection: lowercases the host, drops
+    'www.', the fragment, tracking parameters and any trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(
+        [
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in TRACKING_PARAMS and not key.startswith("utm_")
+        ]
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+
+def merge_results(
+    batches: List[List[SearchResult]], max_results: int
+) -> List[SearchResult]:
+    """Interleaves provider results by rank, dropping duplicate URLs."""
+    merged: List[SearchResult] = []
+    seen = set()
+    for rank in range(max(map(len, batches), default=0)):
+        for batch in batches:
+            if rank >= len(batch) or not batch[rank].url:
+                continue
+            key = canonical_url(batch[rank].url)
+            if key not in seen:
+                seen.add(key)
+                merged.append(batch[rank])
+    return merged[:max_results]
+
+
+async def _run_provider(
+    name: str, query: str, max_results: int
+) -> Optional[List[SearchResult]]:
+    """Runs one provider off the event loop, returning None if it fails."""
+    try:
+        return await run_blocking(
+            get_executor("search", SEARCH_WORKERS), PROVIDERS[name], query, max_results
+        )
+    except Exception as e:
+        logger.error(f"Error searching {name}: {e}")
+        return None
+
+
+async def _query_providers(
+    names: List[str], query: str, max_results: int
+) -> List[SearchResult]:
+    """Queries the given providers concurrently, per the configured strategy."""
+    settings = get_settings()
+    tasks = {
+        asyncio.ensure_future(_run_provider(name, query, max_results)): name
+        for name in names
+    }
+    deadline = asyncio.get_running_loop().time() + settings.search_deadline_seconds
+    results: Dict[str, List[SearchResult]] = {}
+    pending = set(tasks)
+    timed_out = False
+    try:
+        while pending:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                timed_out = True
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.result():
+                    results[tasks[task]] = task.result()
+            if results and settings.search_strategy == "race":
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if timed_out:
+        logger.warning(
+            f"Search providers missed the deadline: {[tasks[t] for t in pending]}"
+        )
+    return merge_results(
+        [results[name] for name in names if name in results], max_results
+    )
+
+
+async def _run_cache(func: Callable[..., T], *args) -> T:
+    """Runs a cache operation, off the event loop when it may touch the disk."""
+    if not get_settings().search_cache_path:
+        return func(*args)
+    return await run_blocking(get_executor("search", SEARCH_WORKERS), func, *args)
+
+
+async def search(query: str, max_results: Optional[int] = None) -> List[SearchResult]:
+    """Searches the web with every configured provider at once.
+
+    With the "race" strategy, the first provider to return results wins. With
+    "merge", results of all providers that answer before the deadline are
+    interleaved by rank and de-duplicated by canonical URL.
+
+    Results are cached per normalized query, provider set and strategy, for a
+    TTL that depends on whether the query is time-sensitive. Empty results are
+    never cached, so a provider outage is not remembered.
+
+    Args:
+        query: The search query.
+        max_results: Results to return. Defaults to the configured value.
+
+    Returns:
+        The normalized results; empty if every provider failed or found nothing.
+
+    """
+    settings = get_settings()
+    max_results = max_results or settings.search_max_results
+    names = [name for name in PROVIDERS if name != "tavily" or settings.tavily_api_key]
+    ttl = search_cache.ttl_for(query)
+    key = (
+        f"{settings.search_strategy}|{','.join(names)}|{max_results}|"
+        f"{search_cache.normalize_query(query)}"
+    )
+    if ttl > 0:
+        cached = await _run_cache(search_cache.get, key)
+        if cached is not None:
+            return _results_adapter.validate_json(cached)
+
+    results = await _query_providers(names, query, max_results)
+    if ttl > 0 and results:
+        value = json.dumps([result.model_dump() for result in results])
+        await _run_cache(search_cache.put, key, value, ttl)
+    metrics = search_cache.get_search_cache_metrics()
+    logger.debug(f"Search cache hit rate {metrics.hit_rate:.0%}.")
+    return results
+
+
+def format_results(results: List[SearchResult], snippet_chars: int = 300) -> str:
+    """Renders results compactly: a numbered title, its URL and a short snippet."""
+    lines = []
+    for number, result in enumerate(results, start=1):
+        snippet = " ".join(result.snippet.split())
+        if len(snippet) > snippet_chars:
+            snippet = snippet[: snippet_chars - 1].rstrip() + "…"
+        lines.append(f"{number}. {result.title}\n   {result.url}\n   {snippet}")
+    return "\n".join(lines)
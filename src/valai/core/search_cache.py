@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from valai.config import get_settings
+from valai.core.storage import open_database
+
+QueryClass = Literal["news", "general"]
+
+# Queries about things that change quickly; their results expire sooner. A
+# bare year is not a sign of recency: the Assistant appends the current year to
+# every Search Agent query that lacks one.
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(latest|today|tonight|yesterday|tomorrow|now|current|breaking|news|live|"
+    r"score|scores|price|prices|stock|weather|election)\b",
+    re.IGNORECASE,
+)
+
+SEARCH_CACHE_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS search_cache (
+        key TEXT PRIMARY KEY,
+        results TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_cache_expires_at ON search_cache(expires_at);
+    """,
+]
+
+_memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+class SearchCacheMetrics(BaseModel):
+    """Counters for the search result cache since the process started."""
+
+    memory_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of searches answered from either cache tier."""
+        hits = self.memory_hits + self.shared_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+
+_metrics = SearchCacheMetrics()
+
+
+def get_search_cache_metrics() -> SearchCacheMetrics:
+    """Returns a snapshot of the search cache counters."""
+    return _metrics.model_copy()
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query for cache lookups: case and whitespace are ignored."""
+    return " ".join(query.lower().split())
+
+
+def classify_query(query: str) -> QueryClass:
+    """Tells whether a query is about something time-sensitive."""
+    return "news" if TIME_SENSITIVE_PATTERN.search(query) else "general"
+
+
+def ttl_for(query: str) -> float:
+    """Returns the cache TTL, in seconds, for a query's class. 0 disables caching."""
+    settings = get_settings()
+    if classify_query(query) == "news":
+        return settings.search_cache_ttl_news_seconds
+    return settings.search_cache_ttl_general_seconds
+
+
+def _shared_path() -> Optional[Path]:
+    """Returns the shared SQLite tier, or None when it is disabled."""
+    configured = get_settings().search_cache_path
+    if not configured:
+        return None
+    path = Path(configured)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get(key: str) -> Optional[str]:
+    """Looks a key up in the in-memory tier, then in the shared tier.
+    Shared hits are copied into memory. Returns the cached JSON, or None.
+    """
+    now = time.time()
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry and entry[0] > now:
+            _memory.move_to_end(key)
+            _metrics.memory_hits += 1
+            return entry[1]
+        if entry:
+            del _memory[key]
+
+    path = _shared_path()
+    if path is not None:
+        with open_database(path, SEARCH_CACHE_MIGRATIONS) as conn:
+            row = conn.execute(
+                "SELECT results, expires_at FROM search_cache "
+                "WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        if row:
+            _remember(key, row["results"], row["expires_at"])
+            _metrics.shared_hits += 1
+            return row["results"]
+
+    _metrics.misses += 1
+    return None
+
+
+def _remember(key: str, value: str, expires_at: float):
+    """Stores an entry in the in-memory LRU tier, evicting the oldest."""
+    with _memory_lock:
+        _memory[key] = (expires_at, value)
+        _memory.move_to_end(key)
+        while len(_memory) > get_settings().search_cache_max_entries:
+            _memory.popitem(last=False)
+
+
+def put(key: str, value: str, ttl: float):
+    """Stores an entry in both tiers for `ttl` seconds."""
+    expires_at = time.time() + ttl
+    _remember(key, value, expires_at)
+    path = _shared_path()
+    if path is None:
+        return
+    with open_database(path, SEARCH_CACHE_MIGRATIONS) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, results, expires_at) "
+            "VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+        conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
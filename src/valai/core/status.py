@@ -0,0 +1,32 @@
+import asyncio
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+
+# Where tools running for the current request post progress updates. The
+# Assistant drains it while a specialist works and relays each update to the
+# UI as a {"status": ...} chunk.
+current_status_queue: ContextVar[Optional[asyncio.Queue]] = ContextVar(
+    "valai_status_queue", default=None
+)
+
+
+def report_status(message: str):
+    """Posts a progress update for the UI. Does nothing outside a request."""
+    queue = current_status_queue.get()
+    if queue is not None:
+        queue.put_nowait({"status": message})
+
+
+async def relay_statuses(
+    task: asyncio.Future, queue: asyncio.Queue
+) -> AsyncIterator[Dict[str, str]]:
+    """Yields the updates posted to `queue` until `task` finishes."""
+    while not task.done():
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            yield getter.result()
+        else:
+            getter.cancel()
+    while not queue.empty():
+        yield queue.get_nowait()
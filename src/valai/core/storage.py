@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence, Set
+
+# Seconds a writer waits for another process to release the database lock.
+BUSY_TIMEOUT_SECONDS = 10
+
+_initialized: Set[str] = set()
+_initialized_lock = threading.Lock()
+
+
+def _ensure_schema(conn: sqlite3.Connection, path: Path, migrations: Sequence[str]):
+    """Brings the database up to date, once per process: switches it to WAL mode
+    and applies every migration newer than its `user_version`.
+    """
+    key = str(path.resolve())
+    with _initialized_lock:
+        if key in _initialized:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(migrations[version:], start=version + 1):
+            conn.executescript(
+                f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;"
+            )
+        _initialized.add(key)
+
+
+@contextmanager
+def open_database(
+    path: Path, migrations: Sequence[str], immediate: bool = False
+) -> Iterator[sqlite3.Connection]:
+    """Opens a SQLite database and runs the body of the `with` block as a single
+    transaction, committing on success and rolling back on error.
+
+    SQLite gives atomic, crash-safe writes and cross-process locking, so several
+    Chainlit workers can share one file without losing updates.
+
+    Args:
+        path: The database file. Created, with `migrations` applied, if missing.
+        migrations: Ordered schema scripts; the database's `user_version` records
+            how many have run. Scripts must be idempotent (`IF NOT EXISTS`), since
+            two processes may race to apply the same one.
+        immediate: Take the write lock up front (`BEGIN IMMEDIATE`). Use it for
+            read-modify-write operations so a concurrent writer cannot slip in
+            between the read and the write.
+
+    Yields:
+        An open connection whose rows can be accessed by column name.
+
+    """
+    if not path.exists():
+        # A new (or deleted and recreated) file needs its migrations applied again.
+        with _initialized_lock:
+            _initialized.discard(str(path.resolve()))
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.row_factory = sqlite3.Row
+    try:
+        _ensure_schema(conn, path, migrations)
+        with conn:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+import psutil
+from loguru import logger
+from pydantic import BaseModel
+
+from valai.config import get_settings
+
+# The first sample is taken this soon after start, so CPU percentages have a
+# baseline to compare with.
+FIRST_SAMPLE_DELAY_SECONDS = 0.25
+
+# Windows, in seconds, summarized by `get_system_metrics`.
+SUMMARY_WINDOWS = [60, 300, 900]
+
+DISK_PATH = "/"
+
+
+class MetricsSample(BaseModel):
+    """One reading of the machine and of the ValAI process."""
+
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    memory_used: int
+    memory_total: int
+    disk_percent: float
+    disk_free: int
+    disk_total: int
+    # Network throughput since the previous sample, in bytes per second.
+    net_sent_rate: float
+    net_recv_rate: float
+    process_cpu_percent: float
+    process_rss: int
+    process_threads: int
+
+
+class MetricsSampler:
+    """Samples system and process metrics on a daemon thread into a ring
+    buffer, so readers get current values and recent history without waiting.
+    psutil's CPU percentages are measured between consecutive samples, which
+    never blocks the caller.
+    """
+
+    def __init__(self, interval: float, history: int):
+        self.interval = interval
+        self.samples: Deque[MetricsSample] = deque(maxlen=history)
+        self.first_sample = threading.Event()
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._net = psutil.net_io_counters()
+        self._net_time = time.monotonic()
+
+    def _sample(self) -> MetricsSample:
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(DISK_PATH)
+        net = psutil.net_io_counters()
+        now = time.monotonic()
+        elapsed = max(now - self._net_time, 1e-6)
+        sample = MetricsSample(
+            timestamp=time.time(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory.percent,
+            memory_used=memory.used,
+            memory_total=memory.total,
+            disk_percent=disk.percent,
+            disk_free=disk.free,
+            disk_total=disk.total,
+            net_sent_rate=(net.bytes_sent - self._net.bytes_sent) / elapsed,
+            net_recv_rate=(net.bytes_recv - self._net.bytes_recv) / elapsed,
+            process_cpu_percent=self._process.cpu_percent(interval=None),
+            process_rss=self._process.memory_info().rss,
+            process_threads=self._process.num_threads(),
+        )
+        self._net, self._net_time = net, now
+        return sample
+
+    def _run(self):
+        # The first calls only set the baseline for the CPU percentages.
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        delay = FIRST_SAMPLE_DELAY_SECONDS
+        while True:
+            time.sleep(delay)
+            delay = self.interval
+            try:
+                sample = self._sample()
+            except Exception as e:
+                logger.error(f"Could not sample system metrics: {e}")
+                continue
+            with self._lock:
+                self.samples.append(sample)
+            self.first_sample.set()
+
+    def start(self):
+        thread = threading.Thread(
+            target=self._run, name="valai-metrics-sampler", daemon=True
+        )
+        thread.start()
+
+    def history(self, seconds: Optional[float] = None) -> List[MetricsSample]:
+        """Returns the samples of the last `seconds` (all of them by default)."""
+        with self._lock:
+            samples = list(self.samples)
+        if seconds is None or not samples:
+            return samples
+        since = samples[-1].timestamp - seconds
+        return [sample for sample in samples if sample.timestamp >= since]
+
+
+_sampler: Optional[MetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def start_metrics_sampler() -> MetricsSampler:
+    """Starts the process-wide metrics sampler, unless it is already running."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            settings = get_settings()
+            interval = settings.system_metrics_interval_seconds
+            history = max(1, int(settings.system_metrics_history_seconds / interval))
+            _sampler = MetricsSampler(interval, history)
+            _sampler.start()
+            logger.info(f"Sampling system metrics every {interval:g}s.")
+    return _sampler
+
+
+def summarize(
+    samples: List[MetricsSample], value: Callable[[MetricsSample], float]
+) -> tuple[float, float, float]:
+    """Returns the min, average and max of a metric over some samples."""
+    values = [value(sample) for sample in samples]
+    return min(values), sum(values) / len(values), max(values)
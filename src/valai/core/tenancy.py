@@ -0,0 +1,26 @@
+from contextvars import ContextVar
+from typing import Optional
+
+# The tenant (signed-in user) whose data the current request may touch.
+# None selects the shared knowledge base used by the CLI and anonymous chats.
+current_tenant: ContextVar[Optional[str]] = ContextVar("valai_tenant", default=None)
+
+
+def set_current_tenant(tenant_id: Optional[str]):
+    """Binds `tenant_id` to the current context, so that tools called while
+    handling this request (including those offloaded to worker threads with a
+    copied context) resolve the tenant's own knowledge base.
+    """
+    current_tenant.set(tenant_id)
+
+
+# The conversation the current request belongs to, e.g. one chat session.
+# Tools that keep per-conversation state (like Python sessions) key it on this.
+current_conversation: ContextVar[Optional[str]] = ContextVar(
+    "valai_conversation", default=None
+)
+
+
+def set_current_conversation(conversation_id: Optional[str]):
+    """Binds `conversation_id` to the current context."""
+    current_conversation.set(conversation_id)
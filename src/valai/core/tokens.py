@@ -0,0 +1,18 @@
+# Rough characters-per-token ratio for English text with common LLM tokenizers.
+# Good enough for budgeting tool output without shipping a tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Returns a cheap estimate of how many tokens `text` will cost the model."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " […]") -> str:
+    """Truncates `text` so that its estimated token count fits `max_tokens`,
+    appending `marker` when anything was cut.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[: max(0, max_chars - len(marker))].rstrip() + marker
@@ -15,28 +15,40 @@ from valai.tools import (
 TOOL_REGISTRY = {
     # Search
     "web_search": search_tools.web_search,
+    "deep_search": search_tools.deep_search,
     # Note Taking
     "save_note": note_tools.save_note,
     "retrieve_notes": note_tools.retrieve_notes,
     "search_notes": note_tools.search_notes,
+    "get_note": note_tools.get_note,
     "delete_note": note_tools.delete_note,
     # Knowledge Base
     "add_document_to_knowledge_base": knowledge_tools.add_document_to_knowledge_base,
     "search_knowledge_base": knowledge_tools.search_knowledge_base,
     "get_knowledge_base_stats": knowledge_tools.get_knowledge_base_stats,
+    "add_document_to_knowledge_base_async": knowledge_tools.add_document_to_knowledge_base_async,
+    "search_knowledge_base_async": knowledge_tools.search_knowledge_base_async,
+    "get_knowledge_base_stats_async": knowledge_tools.get_knowledge_base_stats_async,
     # Code Execution
     "run_python_code": code_tools.run_python_code,
+    "run_python_session": code_tools.run_python_session,
+    "reset_python_session": code_tools.reset_python_session,
     # File Management
     "write_file": file_tools.write_file,
     "read_file": file_tools.read_file,
     "list_directory": file_tools.list_directory,
+    "search_files": file_tools.search_files,
     "create_directory": file_tools.create_directory,
     "delete_file_or_directory": file_tools.delete_file_or_directory,
+    "batch_file_operations": file_tools.batch_file_operations,
     # Calendar
     "list_upcoming_events": calendar_tools.list_upcoming_events,
     "create_calendar_event": calendar_tools.create_calendar_event,
+    "create_calendar_events": calendar_tools.create_calendar_events,
+    "find_free_slots": calendar_tools.find_free_slots,
     # Web Scraping
     "scrape_url": webscraping_tools.scrape_url,
+    "scrape_urls": webscraping_tools.scrape_urls,
     # Email
     "send_email": email_tools.send_email,
     # System
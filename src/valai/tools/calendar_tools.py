@@ -1,6 +1,8 @@
 import datetime
 import os.path
-from typing import Optional
+import threading
+import time
+from typing import List, Optional, Tuple
 
 from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
@@ -11,11 +13,28 @@ from googleapiclient.errors import HttpError
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from valai.config import get_settings
+from valai.core import calendar_store, scheduling
+
 # --- IMPORTANT ---
 # To create events, the scope must be changed from .readonly to the full access scope.
 # If you change the scope, you MUST delete the existing 'token.json' file to re-authenticate.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+CALENDAR_ID = "primary"
+
+# Google accepts at most this many requests in one batch.
+MAX_BATCH_EVENTS = 50
+
+# Tokens are refreshed this long before they expire.
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# The service is built once per process. Its HTTP transport is not thread-safe,
+# and sync tools run on worker threads, so every API call holds this lock.
+_credentials: Optional[Credentials] = None
+_service = None
+_api_lock = threading.RLock()
+
 
 class ListEventsArgs(BaseModel):
     """Input model for listing calendar events."""
@@ -42,8 +61,68 @@ class CreateEventArgs(BaseModel):
     )
 
 
-def _get_calendar_service():
-    """Authenticates and returns a Google Calendar service object."""
+class CreateEventsArgs(BaseModel):
+    """Input model for creating several calendar events at once."""
+
+    events: List[CreateEventArgs] = Field(
+        ...,
+        description="The events to create.",
+        min_length=1,
+        max_length=MAX_BATCH_EVENTS,
+    )
+
+
+class FindFreeSlotsArgs(BaseModel):
+    """Input model for finding free time in the calendar."""
+
+    duration_minutes: int = Field(
+        ..., description="Length of the meeting or block, in minutes.", gt=0, le=1440
+    )
+    start: Optional[str] = Field(
+        None,
+        description="Start of the search range, as an ISO 8601 date or date-time "
+        "(e.g., '2025-07-07' or '2025-07-07T13:00'). Defaults to now.",
+    )
+    end: Optional[str] = Field(
+        None,
+        description="End of the search range, as an ISO 8601 date (inclusive) or "
+        "date-time. Defaults to 7 days after the start.",
+    )
+    work_start: Optional[str] = Field(
+        None,
+        description="Start of the working day as HH:MM. Defaults to the configured "
+        "working hours.",
+    )
+    work_end: Optional[str] = Field(
+        None,
+        description="End of the working day as HH:MM. Defaults to the configured "
+        "working hours.",
+    )
+    include_weekends: bool = Field(
+        False, description="Also look for free time on Saturdays and Sundays."
+    )
+    timezone: Optional[str] = Field(
+        None,
+        description="IANA time zone for the range and working hours (e.g., "
+        "'Europe/Berlin'). Defaults to the configured time zone.",
+    )
+    max_slots: int = Field(
+        10, description="Maximum number of free slots to return.", gt=0, le=50
+    )
+
+
+def _expires_soon(creds: Credentials) -> bool:
+    """Tells whether an access token is expired or about to expire."""
+    if creds.expiry is None:
+        return False
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    return creds.expiry - TOKEN_REFRESH_MARGIN <= now
+
+
+def _load_credentials() -> Credentials:
+    """Loads the saved credentials, refreshing the token (or re-authenticating)
+    when it is expired or close to expiring, and saves the result.
+    """
     creds = None
     token_path = "token.json"
     creds_path = "credentials.json"
@@ -54,18 +133,23 @@ def _get_calendar_service():
             "Please download them from the Google Cloud Console and place them in the project root."
         )
 
-    if os.path.exists(token_path):
+    if _credentials is not None:
+        creds = _credentials
+    elif os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    if not creds or not creds.valid or _expires_soon(creds):
+        if creds and creds.refresh_token:
             try:
-                logger.info("Refreshing expired Google API token.")
+                logger.info("Refreshing Google API token.")
                 creds.refresh(Request())
             except RefreshError as e:
                 logger.error(f"Token refresh failed: {e}. Please re-authenticate.")
-                os.remove(token_path)  # Remove bad token
+                if os.path.exists(token_path):
+                    os.remove(token_path)  # Remove bad token
                 creds = None  # Force re-authentication
+        else:
+            creds = None
         if not creds:
             logger.info("Performing new Google API authentication.")
             flow = InstalledAppFlow.from_client_secrets_file(creds_path, SCOPES)
@@ -75,33 +159,136 @@ def _get_calendar_service():
             token.write(creds.to_json())
             logger.success(f"Google API token saved to {token_path}")
 
-    return build("calendar", "v3", credentials=creds)
+    return creds
+
+
+def _get_calendar_service():
+    """Returns the Google Calendar service object, built once and reused.
+    The token is refreshed ahead of its expiry, so calls never fail on it.
+    """
+    global _credentials, _service
+    with _api_lock:
+        if (
+            _service is not None
+            and _credentials.valid
+            and not _expires_soon(_credentials)
+        ):
+            return _service
+        creds = _load_credentials()
+        # A refresh updates the credentials the service already holds.
+        if _service is None or creds is not _credentials:
+            _service = build("calendar", "v3", credentials=creds, cache_discovery=False)
+        _credentials = creds
+        return _service
+
+
+def _fetch_changes(service, sync_token: Optional[str]) -> Tuple[List[dict], str]:
+    """Pages through the events changed since `sync_token`, or through every
+    event from `calendar_sync_past_days` ago onwards when there is no token.
+    Returns the events and the token for the next sync.
+    """
+    params = {"calendarId": CALENDAR_ID, "singleEvents": True, "maxResults": 2500}
+    if sync_token:
+        params["syncToken"] = sync_token
+    else:
+        past = datetime.timedelta(days=get_settings().calendar_sync_past_days)
+        since = datetime.datetime.now(datetime.UTC) - past
+        params["timeMin"] = since.isoformat()
+    events: List[dict] = []
+    while True:
+        page = service.events().list(**params).execute()
+        events.extend(page.get("items", []))
+        if "nextPageToken" not in page:
+            return events, page.get("nextSyncToken")
+        params["pageToken"] = page["nextPageToken"]
+
+
+def _sync_events(service):
+    """Brings the local event store up to date, at most once per
+    `calendar_sync_interval_seconds`. Only the changes since the last sync are
+    downloaded; a full sync runs on first use or when Google expires the token.
+    """
+    with _api_lock:
+        sync_token, synced_at = calendar_store.get_sync_state(CALENDAR_ID)
+        interval = get_settings().calendar_sync_interval_seconds
+        if synced_at is not None and time.time() - synced_at < interval:
+            return
+        try:
+            events, next_token = _fetch_changes(service, sync_token)
+        except HttpError as e:
+            if e.resp.status != 410 or not sync_token:
+                raise
+            logger.info("Calendar sync token expired; running a full sync.")
+            sync_token = None
+            events, next_token = _fetch_changes(service, None)
+        calendar_store.apply_changes(
+            CALENDAR_ID, events, next_token, full=sync_token is None
+        )
+        logger.info(f"Synced {len(events)} calendar change(s).")
+
+
+def _event_time(value: str) -> dict:
+    """Builds an API start/end for an ISO 8601 date-time. Without a configured
+    time zone, a time with no UTC offset is taken as system local time.
+    """
+    timezone = get_settings().calendar_timezone
+    if timezone:
+        return {"dateTime": value, "timeZone": timezone}
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        value = moment.astimezone().isoformat()
+    return {"dateTime": value}
+
+
+def _event_body(args: CreateEventArgs) -> dict:
+    return {
+        "summary": args.summary,
+        "description": args.description,
+        "start": _event_time(args.start_time),
+        "end": _event_time(args.end_time),
+    }
+
+
+def _parse_moment(value: str, tz: datetime.tzinfo, end: bool = False) -> float:
+    """Converts an ISO 8601 date or date-time into a timestamp. Times with no
+    UTC offset are taken in `tz`; a plain date as the end of a range includes
+    that whole day.
+    """
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz)
+    if end and len(value) == len("YYYY-MM-DD"):
+        moment += datetime.timedelta(days=1)
+    return moment.timestamp()
+
+
+def _format_slot(start: float, end: float, tz: datetime.tzinfo) -> str:
+    begins = datetime.datetime.fromtimestamp(start, tz)
+    ends = datetime.datetime.fromtimestamp(end, tz)
+    minutes = round((end - start) / 60)
+    length = f"{minutes // 60}h {minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+    if ends.date() == begins.date():
+        until = ends.strftime("%H:%M")
+    else:
+        until = ends.strftime("%a %Y-%m-%d %H:%M")
+    return f"- {begins.strftime('%a %Y-%m-%d %H:%M')} to {until} ({length})"
 
 
 def list_upcoming_events(args: ListEventsArgs) -> str:
     """Lists upcoming events from the user's primary Google Calendar."""
     try:
-        service = _get_calendar_service()
-        now = datetime.datetime.utcnow().isoformat() + "Z"
-
-        logger.info(f"Fetching next {args.max_results} calendar events.")
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=now,
-                maxResults=args.max_results,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
+        _sync_events(_get_calendar_service())
+
+        logger.info(f"Reading next {args.max_results} calendar events.")
+        events = calendar_store.events_between(
+            CALENDAR_ID, time.time(), limit=args.max_results
         )
-        events = events_result.get("items", [])
         if not events:
             return "No upcoming events found."
 
         event_list = [
-            f"- {e['start'].get('dateTime', e['start'].get('date'))}: {e['summary']}"
+            f"- {e['start'].get('dateTime', e['start'].get('date'))}: "
+            f"{e.get('summary', '(no title)')}"
             for e in events
         ]
         return "Upcoming events:\n" + "\n".join(event_list)
@@ -119,20 +306,15 @@ def create_calendar_event(args: CreateEventArgs) -> str:
     """Creates a new event in the user's primary Google Calendar."""
     try:
         service = _get_calendar_service()
-        event = {
-            "summary": args.summary,
-            "description": args.description,
-            "start": {
-                "dateTime": args.start_time,
-                "timeZone": "America/New_York",
-            },  # Example timezone
-            "end": {"dateTime": args.end_time, "timeZone": "America/New_York"},
-        }
+        event = _event_body(args)
 
         logger.info(f"Creating calendar event: '{args.summary}'")
-        created_event = (
-            service.events().insert(calendarId="primary", body=event).execute()
-        )
+        with _api_lock:
+            created_event = (
+                service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+            )
+        # Write-through, so the next listing shows it without waiting for a sync.
+        calendar_store.upsert_events(CALENDAR_ID, [created_event])
 
         url = created_event.get("htmlLink")
         logger.success(f"Event created successfully. URL: {url}")
@@ -145,3 +327,116 @@ def create_calendar_event(args: CreateEventArgs) -> str:
             f"An unexpected error occurred in create_calendar_event: {e}"
         )
         return f"An unexpected error occurred: {e}"
+
+
+def create_calendar_events(args: CreateEventsArgs) -> str:
+    """Creates several events in the user's primary Google Calendar with one
+    batched API request. Returns one line per event.
+    """
+    try:
+        service = _get_calendar_service()
+        outcomes: dict = {}
+
+        def record(request_id, response, exception):
+            outcomes[int(request_id)] = exception or response
+
+        batch = service.new_batch_http_request(callback=record)
+        for number, event in enumerate(args.events, start=1):
+            body = _event_body(event)
+            batch.add(
+                service.events().insert(calendarId=CALENDAR_ID, body=body),
+                request_id=str(number),
+            )
+
+        logger.info(f"Creating {len(args.events)} calendar events in one batch.")
+        with _api_lock:
+            batch.execute()
+
+        created = []
+        lines = []
+        for number, event in enumerate(args.events, start=1):
+            outcome = outcomes.get(number)
+            label = f"{number}. '{event.summary}'"
+            if isinstance(outcome, dict):
+                created.append(outcome)
+                lines.append(f"{label}: created ({outcome.get('htmlLink')})")
+            else:
+                lines.append(f"{label}: FAILED ({outcome or 'no response'})")
+        # Write-through, so listings and free-slot searches see them right away.
+        if created:
+            calendar_store.upsert_events(CALENDAR_ID, created)
+
+        summary = f"{len(created)}/{len(lines)} event(s) created"
+        if len(created) < len(lines):
+            summary += f", {len(lines) - len(created)} failed"
+        return summary + ".\n" + "\n".join(lines)
+    except HttpError as e:
+        logger.error(f"Google API HTTP error while creating events: {e}")
+        return f"Error creating events via Google Calendar API: {e}"
+    except Exception as e:
+        logger.opt(exception=True).error(
+            f"An unexpected error occurred in create_calendar_events: {e}"
+        )
+        return f"An unexpected error occurred: {e}"
+
+
+def find_free_slots(args: FindFreeSlotsArgs) -> str:
+    """Finds free time of at least the given length within working hours,
+    computed from the locally synced events.
+    """
+    try:
+        settings = get_settings()
+        tz = scheduling.resolve_timezone(args.timezone or settings.calendar_timezone)
+        day_start = datetime.time.fromisoformat(
+            args.work_start or settings.calendar_work_start
+        )
+        day_end = datetime.time.fromisoformat(
+            args.work_end or settings.calendar_work_end
+        )
+        if day_end <= day_start:
+            return "Error: the working day must end after it starts."
+        start = _parse_moment(args.start, tz) if args.start else time.time()
+        if args.end:
+            end = _parse_moment(args.end, tz, end=True)
+        else:
+            end = start + datetime.timedelta(days=7).total_seconds()
+        if end <= start:
+            return "Error: the end of the range must be after its start."
+
+        _sync_events(_get_calendar_service())
+
+        index = scheduling.BusyIndex(
+            calendar_store.busy_intervals(CALENDAR_ID, start, end, tz)
+        )
+        windows = scheduling.working_windows(
+            start, end, tz, day_start, day_end, args.include_weekends
+        )
+        slots = scheduling.find_free_slots(
+            index, windows, args.duration_minutes * 60, args.max_slots
+        )
+        logger.info(
+            f"Found {len(slots)} free slot(s) of {args.duration_minutes} min "
+            f"among {len(index.busy)} busy interval(s)."
+        )
+        if not slots:
+            return (
+                f"No free slot of {args.duration_minutes} minutes within working "
+                "hours in that range."
+            )
+        lines = [
+            _format_slot(slot_start, slot_end, tz) for slot_start, slot_end in slots
+        ]
+        return (
+            f"Free slots of at least {args.duration_minutes} minutes "
+            f"({getattr(tz, 'key', None) or tz}):\n" + "\n".join(lines)
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    except HttpError as e:
+        logger.error(f"Google API HTTP error: {e}")
+        return f"Error communicating with Google Calendar API: {e}"
+    except Exception as e:
+        logger.opt(exception=True).error(
+            f"An unexpected error occurred in find_free_slots: {e}"
+        )
+        return f"An unexpected error occurred: {e}"
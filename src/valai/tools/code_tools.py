@@ -1,8 +1,31 @@
-import subprocess
-import sys
+from valai.core.sandbox import ExecutionResult, get_session_manager, get_worker_pool
+from valai.core.tenancy import current_conversation
 
+# Session key used outside of a conversation (e.g. when tools are called directly).
+DEFAULT_SESSION = "default"
 
-def run_python_code(code: str) -> str:
+
+def _format_result(result: ExecutionResult) -> str:
+    note = ""
+    if result.truncated:
+        note = (
+            f"\n(Output truncated: {result.stdout_bytes:,} bytes on stdout and "
+            f"{result.stderr_bytes:,} bytes on stderr in total.)"
+        )
+    if result.error:
+        output = (result.stdout + result.stderr).strip()
+        if output:
+            return f"Error: {result.error} Output so far:\n```\n{output}\n```{note}"
+        return f"Error: {result.error}"
+    if not result.ok:
+        # This catches errors from within the executed code itself
+        return f"Error during execution:\n```\n{result.stderr}\n```{note}"
+    if not result.stdout:
+        return "Code executed successfully with no output."
+    return f"Execution successful. Output:\n```\n{result.stdout}\n```{note}"
+
+
+async def run_python_code(code: str) -> str:
     """Executes a given string of Python code and returns its standard output.
     Use this tool to perform calculations, run algorithms, or execute any Python script.
     The code runs in a sandboxed environment. Only use standard Python libraries.
@@ -15,26 +38,40 @@ def run_python_code(code: str) -> str:
 
     """
     try:
-        # The command is constructed to execute the provided code string
-        # `capture_output=True` captures stdout and stderr
-        # `text=True` returns stdout and stderr as strings
-        # `check=True` raises a CalledProcessError if the command returns a non-zero exit code
-        result = subprocess.run(
-            [sys.executable, "-c", code],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=30,  # Add a timeout for safety
-        )
-        output = result.stdout
-        if not output:
-            return "Code executed successfully with no output."
-        return f"Execution successful. Output:\n```\n{output}\n```"
-    except subprocess.CalledProcessError as e:
-        # This catches errors from within the executed code itself
-        return f"Error during execution:\n```\n{e.stderr}\n```"
-    except subprocess.TimeoutExpired:
-        return "Error: Code execution timed out after 30 seconds."
+        # Runs on a warm, pre-started interpreter with CPU, memory and time limits.
+        result = await get_worker_pool().run(code)
     except Exception as e:
-        # This catches other errors, e.g., if the subprocess can't be started
+        # This catches other errors, e.g., if the interpreter can't be started
         return f"An unexpected error occurred: {e}"
+    return _format_result(result)
+
+
+async def run_python_session(code: str) -> str:
+    """Executes Python code in this conversation's persistent interpreter and returns
+    its standard output. Variables, imports and functions defined by earlier calls are
+    still available, so multi-step analysis does not need to recompute anything.
+    Only use standard Python libraries.
+
+    Args:
+        code (str): The Python code to execute.
+
+    Returns:
+        The standard output from the executed code, or an error message.
+
+    """
+    key = current_conversation.get() or DEFAULT_SESSION
+    try:
+        result = await get_session_manager().run(key, code)
+    except Exception as e:
+        return f"An unexpected error occurred: {e}"
+    return _format_result(result)
+
+
+async def reset_python_session() -> str:
+    """Discards this conversation's persistent Python interpreter and all of its
+    variables. The next run_python_session call starts from a clean interpreter.
+    """
+    key = current_conversation.get() or DEFAULT_SESSION
+    if get_session_manager().reset(key):
+        return "The Python session was reset."
+    return "There was no active Python session to reset."
@@ -1,8 +1,40 @@
+import fnmatch
+import itertools
+import mmap
+import os
+import re
 import shutil
+import tempfile
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, List, Literal, Optional, Tuple, Union
 
 from pydantic import BaseModel, Field
 
+from valai.config import get_settings
+from valai.core.documents import ExtractedDocument, is_document
+from valai.core.executors import get_process_pool
+
+# Memory-mapped files and extracted document text are read the same way.
+Buffer = Union[mmap.mmap, bytes]
+
+# Bytes sniffed from the start of a file to decide whether it is binary.
+BINARY_SNIFF_BYTES = 8192
+
+# Newlines are counted a block at a time, so large offsets never copy the whole file.
+LINE_COUNT_BLOCK_BYTES = 1 << 20
+
+# Upper bound on list_directory's page size, whatever the caller asks for.
+MAX_LIST_PAGE_SIZE = 1000
+
+# Directories search_files never descends into, in addition to hidden ones
+# and those listed in the search root's .gitignore.
+SEARCH_IGNORED_DIRS = {"__pycache__", "node_modules", ".git", ".venv", "venv"}
+
+# Matching lines longer than this are shortened in search_files results.
+MAX_MATCH_LINE_CHARS = 300
+
 
 class WriteFileArgs(BaseModel):
     """Input model for the write_file tool."""
@@ -19,6 +51,36 @@ class ReadFileArgs(BaseModel):
     file_path: str = Field(
         ..., description="The relative or absolute path to the file."
     )
+    offset: int = Field(
+        0,
+        description="Byte offset to start reading (or searching) from. "
+        "Pass the offset given at the end of a truncated result to continue.",
+        ge=0,
+    )
+    length: Optional[int] = Field(
+        None, description="Maximum number of bytes to read from `offset`.", gt=0
+    )
+    start_line: Optional[int] = Field(
+        None, description="First line to return, starting at 1.", gt=0
+    )
+    end_line: Optional[int] = Field(
+        None, description="Last line to return (inclusive).", gt=0
+    )
+    head: Optional[int] = Field(
+        None, description="Return only the first N lines.", gt=0
+    )
+    tail: Optional[int] = Field(None, description="Return only the last N lines.", gt=0)
+    pattern: Optional[str] = Field(
+        None,
+        description="A regular expression; only matching lines are returned, "
+        "prefixed with their line numbers.",
+    )
+    start_page: Optional[int] = Field(
+        None, description="PDFs only: the first page to read, starting at 1.", gt=0
+    )
+    end_page: Optional[int] = Field(
+        None, description="PDFs only: the last page to read (inclusive).", gt=0
+    )
 
 
 class ListDirectoryArgs(BaseModel):
@@ -28,6 +90,56 @@ class ListDirectoryArgs(BaseModel):
         default=".",
         description="The path of the directory to list. Defaults to the current directory.",
     )
+    pattern: Optional[str] = Field(
+        None,
+        description="A glob such as '*.py'. Matched against entry names, or against "
+        "paths relative to `path` if it contains '/'.",
+    )
+    max_depth: int = Field(
+        1,
+        description="How deep to recurse. 1 lists only the directory itself.",
+        ge=1,
+        le=32,
+    )
+    details: bool = Field(
+        False, description="Include each file's size and modification time."
+    )
+    sort_by: Literal["name", "size", "mtime", "none"] = Field(
+        "name",
+        description="Order within each directory: by name, largest first, newest "
+        "first, or 'none' for the fastest, filesystem order.",
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="Pass the cursor given at the end of a previous page to continue.",
+    )
+    page_size: Optional[int] = Field(
+        None,
+        description="Maximum number of entries to return.",
+        gt=0,
+        le=MAX_LIST_PAGE_SIZE,
+    )
+
+
+class SearchFilesArgs(BaseModel):
+    """Input model for the search_files tool."""
+
+    query: str = Field(..., description="The text or regular expression to find.")
+    path: str = Field(".", description="The directory to search. Defaults to '.'.")
+    regex: bool = Field(
+        False, description="Treat `query` as a regular expression, not literal text."
+    )
+    case_sensitive: bool = Field(False, description="Match case exactly.")
+    glob: Optional[str] = Field(
+        None, description="Only search files whose name matches, e.g. '*.py'."
+    )
+    context_lines: int = Field(
+        0, description="Lines of context to show around each match.", ge=0, le=5
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="Pass the cursor given at the end of a previous page to continue.",
+    )
 
 
 class CreateDirectoryArgs(BaseModel):
@@ -42,44 +154,677 @@ class DeleteArgs(BaseModel):
     path: str = Field(..., description="The path of the file or directory to delete.")
 
 
+class FileOperation(BaseModel):
+    """A single step of a batch_file_operations call."""
+
+    op: Literal["write", "append", "mkdir", "move", "delete"] = Field(
+        ..., description="The operation to perform."
+    )
+    path: str = Field(..., description="The file or directory the operation acts on.")
+    content: Optional[str] = Field(
+        None, description="The text to write or append. Required for write/append."
+    )
+    destination: Optional[str] = Field(
+        None, description="Where to move `path` to. Required for move."
+    )
+
+
+class BatchFileOperationsArgs(BaseModel):
+    """Input model for the batch_file_operations tool."""
+
+    operations: List[FileOperation] = Field(
+        ...,
+        description="The operations to perform, in order.",
+        min_length=1,
+        max_length=200,
+    )
+    stop_on_error: bool = Field(
+        True, description="Skip the remaining operations after the first failure."
+    )
+
+
+@lru_cache(maxsize=1)
+def _new_file_mode() -> int:
+    """Returns the mode open() gives new files: 0o666 less the umask. The umask
+    can only be read by setting it, so this is done once and cached.
+    """
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _fsync_directory(directory: Path):
+    """Flushes a directory entry change (e.g. a rename) to disk."""
+    if os.name == "nt":
+        return  # Directories cannot be opened for fsync on Windows.
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: Path, content: str) -> int:
+    """Writes a file via a temporary sibling and a rename, so readers (and a
+    crash) see either the old content or the new, never a partial file.
+    Returns the number of bytes written.
+    """
+    # Renaming onto a symlink would replace the link itself, so write through
+    # to the file it points at.
+    path = Path(os.path.realpath(path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = content.encode("utf-8")
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600; keep the target's mode, or give a
+        # new file the usual one.
+        if path.exists():
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, _new_file_mode())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    # The rename is only durable once the directory itself is flushed.
+    _fsync_directory(path.parent)
+    return len(data)
+
+
 def write_file(args: WriteFileArgs) -> str:
     """Writes content to a specified file, creating directories if they don't exist."""
     try:
-        path = Path(args.file_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(args.content)
+        _atomic_write(Path(args.file_path), args.content)
         return f"Successfully wrote content to '{args.file_path}'."
     except Exception as e:
         return f"Error writing to file '{args.file_path}': {e}"
 
 
+def _count_newlines(mm: Buffer, start: int, end: int) -> int:
+    """Counts the newlines in `mm[start:end]`."""
+    count = 0
+    for block in range(start, end, LINE_COUNT_BLOCK_BYTES):
+        count += mm[block : min(end, block + LINE_COUNT_BLOCK_BYTES)].count(b"\n")
+    return count
+
+
+def _decode(data: bytes) -> str:
+    """Decodes file bytes, replacing anything that is not valid UTF-8."""
+    return data.decode("utf-8", errors="replace")
+
+
+def _read_bytes(mm: Buffer, offset: int, length: Optional[int], cap: int) -> str:
+    """Returns up to `length` bytes from `offset`, ending on a line boundary when
+    the output cap cuts the read short.
+    """
+    size = len(mm)
+    if offset >= size:
+        return f"[Offset {offset} is past the end of the file ({size} bytes).]"
+    requested_end = size if length is None else min(size, offset + length)
+    end = min(requested_end, offset + cap)
+    if end < requested_end:
+        newline = mm.rfind(b"\n", offset, end)
+        if newline != -1:
+            end = newline + 1
+    text = _decode(mm[offset:end])
+    if end < size:
+        text += (
+            f"\n[Showing bytes {offset}-{end} of {size}. Continue with offset={end}.]"
+        )
+    return text
+
+
+def _read_lines(mm: Buffer, start_line: int, end_line: Optional[int], cap: int) -> str:
+    """Returns lines `start_line` to `end_line` (inclusive), up to the output cap."""
+    size = len(mm)
+    position = 0
+    for _ in range(start_line - 1):
+        newline = mm.find(b"\n", position)
+        if newline == -1 or newline + 1 == size:
+            return f"[The file has fewer than {start_line} lines.]"
+        position = newline + 1
+
+    begin = position
+    line = start_line
+    note = ""
+    while position < size and (end_line is None or line <= end_line):
+        newline = mm.find(b"\n", position)
+        line_end = size if newline == -1 else newline + 1
+        if line_end - begin > cap:
+            if position == begin:
+                # A single line longer than the cap: return the first part of it.
+                position = begin + cap
+                note = f"Line {line} is truncated. Continue with offset={position}."
+            else:
+                note = f"Output capped. Continue with start_line={line}."
+            break
+        position = line_end
+        line += 1
+    text = _decode(mm[begin:position])
+    return f"{text}\n[{note}]" if note else text
+
+
+def _read_tail(mm: Buffer, lines: int, cap: int) -> str:
+    """Returns the last `lines` lines, up to the output cap."""
+    size = len(mm)
+    # A trailing newline ends the last line rather than starting an empty one.
+    cut = size - 1 if mm[size - 1 : size] == b"\n" else size
+    begin = 0
+    for _ in range(lines):
+        newline = mm.rfind(b"\n", 0, cut)
+        if newline == -1:
+            begin = 0
+            break
+        begin, cut = newline + 1, newline
+    note = ""
+    if size - begin > cap:
+        begin = size - cap
+        newline = mm.find(b"\n", begin)
+        if newline != -1 and newline + 1 < size:
+            begin = newline + 1
+        note = f"\n[Output capped to the last {size - begin} bytes.]"
+    return _decode(mm[begin:size]) + note
+
+
+def _read_matches(mm: Buffer, pattern: str, offset: int, cap: int) -> str:
+    """Returns the lines matching `pattern` from `offset` on, with line numbers.
+    `^` and `$` anchor at line boundaries, as in grep.
+    """
+    regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    size = len(mm)
+    line_number = _count_newlines(mm, 0, offset) + 1
+    counted_to = offset
+    position = offset
+    results = []
+    used = 0
+    while position <= size:
+        match = regex.search(mm, position)
+        if match is None:
+            break
+        line_start = mm.rfind(b"\n", 0, match.start()) + 1
+        newline = mm.find(b"\n", match.end())
+        line_end = size if newline == -1 else newline
+        line_number += _count_newlines(mm, counted_to, line_start)
+        counted_to = line_start
+        entry = f"{line_number}: {_decode(mm[line_start:line_end])}"
+        if results and used + len(entry) > cap:
+            results.append(f"[Output capped. Continue with offset={line_start}.]")
+            break
+        results.append(entry[:cap])
+        used += len(entry) + 1
+        position = line_end + 1
+    if not results:
+        return f"No lines match '{pattern}'."
+    return "\n".join(results)
+
+
+def _read_mapped(mm: Buffer, args: ReadFileArgs, cap: int) -> str:
+    """Serves a read_file request from a memory-mapped file or extracted text."""
+    if b"\x00" in mm[:BINARY_SNIFF_BYTES]:
+        return f"Error: '{args.file_path}' appears to be a binary file."
+    if args.pattern is not None:
+        return _read_matches(mm, args.pattern, args.offset, cap)
+    if args.tail is not None:
+        return _read_tail(mm, args.tail, cap)
+    if args.head is not None:
+        return _read_lines(mm, 1, args.head, cap)
+    if args.start_line is not None or args.end_line is not None:
+        return _read_lines(mm, args.start_line or 1, args.end_line, cap)
+    return _read_bytes(mm, args.offset, args.length, cap)
+
+
+def _read_document(path: Path, args: ReadFileArgs, cap: int) -> str:
+    """Serves a read_file request for a PDF or HTML file from its extracted
+    text. Pages are extracted lazily: a plain read stops at the first page that
+    does not fit, and any page extracted once is served from the cache.
+    """
+    document = ExtractedDocument(path)
+    start = args.start_page or 1
+    if start > document.page_count:
+        return f"[The document has {document.page_count} page(s).]"
+    plain = (
+        args.offset == 0
+        and args.length is None
+        and args.start_line is None
+        and args.end_line is None
+        and args.head is None
+        and args.tail is None
+        and args.pattern is None
+    )
+    if not plain:
+        text = document.text(start, args.end_page)
+        return _read_mapped(text.encode("utf-8"), args, cap)
+
+    parts: List[str] = []
+    used = 0
+    shown = start
+    for number, page_text in document.pages(start, args.end_page):
+        text = document.format_page(number, page_text)
+        if parts and used + len(text) > cap:
+            parts.append(
+                f"[Showing pages {start}-{shown} of {document.page_count}. "
+                f"Continue with start_page={number}.]"
+            )
+            break
+        if len(text) > cap:
+            # Too long for a single result: it is paged by offset instead.
+            parts.append(_read_bytes(text.encode("utf-8"), 0, None, cap))
+            parts.append(
+                f"[Pass start_page={number} and end_page={number} with that offset.]"
+            )
+            break
+        parts.append(text)
+        used += len(text) + 2
+        shown = number
+    return "\n\n".join(parts)
+
+
 def read_file(args: ReadFileArgs) -> str:
-    """Reads the content of a specified file."""
+    """Reads a file, or part of one. By default the file is returned from the
+    start; use `offset`/`length` for a byte range, `start_line`/`end_line`,
+    `head` or `tail` for lines, or `pattern` to return only matching lines.
+    PDFs and HTML pages are read as extracted text; `start_page`/`end_page`
+    select PDF pages. Output is capped, and a truncated result says how to
+    continue.
+    """
     try:
         path = Path(args.file_path)
         if not path.is_file():
             return f"Error: File not found at '{args.file_path}'."
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        modes = [
+            args.start_line is not None or args.end_line is not None,
+            args.head is not None,
+            args.tail is not None,
+            args.pattern is not None,
+        ]
+        if sum(modes) > 1:
+            return "Error: Use only one of start_line/end_line, head, tail or pattern."
+        if path.stat().st_size == 0:
+            return f"The file '{args.file_path}' is empty."
+        if is_document(path):
+            return _read_document(path, args, get_settings().file_read_max_bytes)
+
+        with open(path, "rb") as f:
+            # Mapping the file lets the OS page in only the parts that are read.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _read_mapped(mm, args, get_settings().file_read_max_bytes)
+    except re.error as e:
+        return f"Error: Invalid pattern '{args.pattern}': {e}"
     except Exception as e:
         return f"Error reading file '{args.file_path}': {e}"
 
 
+def _scan_sorted(path: str, sort_by: str) -> Iterator[os.DirEntry]:
+    """Yields the entries of one directory in the requested order. Only this
+    directory's entries are held in memory, and only when sorting.
+    """
+    with os.scandir(path) as it:
+        if sort_by == "none":
+            yield from it
+            return
+        entries: List[os.DirEntry] = list(it)
+    if sort_by == "size":
+        entries.sort(key=lambda e: e.stat(follow_symlinks=False).st_size, reverse=True)
+    elif sort_by == "mtime":
+        entries.sort(key=lambda e: e.stat(follow_symlinks=False).st_mtime, reverse=True)
+    else:
+        entries.sort(key=lambda e: e.name)
+    yield from entries
+
+
+def _resume_stack(
+    root: str, after: str, max_depth: int, sort_by: str
+) -> List[Tuple[Iterator[os.DirEntry], str, int]]:
+    """Rebuilds the walk's directory stack just past the entry `after`, a
+    relative path. Only the directories along that path are scanned; entries
+    before it are skipped without descending into them.
+    """
+    stack = []
+    directory, prefix, depth = root, "", 1
+    for name in after.split("/"):
+        entries = _scan_sorted(directory, sort_by)
+        stack.append((entries, prefix, depth))
+        found = None
+        try:
+            for entry in entries:
+                if entry.name == name:
+                    found = entry
+                    break
+                if sort_by == "name" and entry.name > name:
+                    # The entry is gone; resume at the first one after it.
+                    stack[-1] = (itertools.chain([entry], entries), prefix, depth)
+                    return stack
+        except OSError:
+            return stack
+        if (
+            found is None
+            or depth >= max_depth
+            or not found.is_dir(follow_symlinks=False)
+        ):
+            return stack
+        directory, prefix, depth = found.path, f"{prefix}{name}/", depth + 1
+    # The entry is a directory whose contents come next.
+    stack.append((_scan_sorted(directory, sort_by), prefix, depth))
+    return stack
+
+
+def _walk_entries(
+    root: str, max_depth: int, sort_by: str, after: Optional[str] = None
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Streams (relative path, entry) pairs depth-first, descending at most
+    `max_depth` levels, optionally starting after the entry `after`.
+    Unreadable subdirectories are skipped.
+    """
+    if after:
+        stack = _resume_stack(root, after, max_depth, sort_by)
+    else:
+        stack = [(_scan_sorted(root, sort_by), "", 1)]
+    while stack:
+        entries, prefix, depth = stack[-1]
+        try:
+            entry = next(entries, None)
+        except OSError:
+            entry = None
+        if entry is None:
+            stack.pop()
+            continue
+        relative = prefix + entry.name
+        yield relative, entry
+        if depth < max_depth and entry.is_dir(follow_symlinks=False):
+            stack.append((_scan_sorted(entry.path, sort_by), relative + "/", depth + 1))
+
+
+def _format_size(size: float) -> str:
+    """Formats a byte count for humans, e.g. 1536 -> '1.5 KB'."""
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
+
+
+def _format_entry(relative: str, entry: os.DirEntry, details: bool) -> str:
+    """Formats one listing line; directories end with '/'."""
+    if entry.is_dir(follow_symlinks=False):
+        return f"- {relative}/"
+    if not details:
+        return f"- {relative}"
+    stat = entry.stat(follow_symlinks=False)
+    modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
+    return f"- {relative} ({_format_size(stat.st_size)}, modified {modified})"
+
+
 def list_directory(args: ListDirectoryArgs) -> str:
-    """Lists the contents of a specified directory."""
+    """Lists a directory, optionally recursively, one page at a time. Entries
+    can be filtered with a glob, sorted, and shown with their size and
+    modification time.
+    """
     try:
         path = Path(args.path)
         if not path.is_dir():
             return f"Error: '{args.path}' is not a valid directory."
-        items = [f.name for f in path.iterdir()]
-        if not items:
+        page_size = min(
+            args.page_size or get_settings().file_list_page_size, MAX_LIST_PAGE_SIZE
+        )
+
+        # The cursor is the last entry returned, so a page costs only the
+        # directories along it plus the entries returned.
+        entries = _walk_entries(str(path), args.max_depth, args.sort_by, args.cursor)
+        if args.pattern:
+            match_path = "/" in args.pattern
+            entries = (
+                (relative, entry)
+                for relative, entry in entries
+                if fnmatch.fnmatch(relative if match_path else entry.name, args.pattern)
+            )
+        # One entry past the page tells whether another page exists.
+        window = list(itertools.islice(entries, page_size + 1))
+        page = window[:page_size]
+
+        if not page:
+            if args.cursor:
+                return f"No more entries in '{args.path}' after cursor {args.cursor}."
+            if args.pattern:
+                return f"No entries in '{args.path}' match '{args.pattern}'."
             return f"The directory '{args.path}' is empty."
-        return "Directory listing:\n- " + "\n- ".join(items)
+        lines = [
+            _format_entry(relative, entry, args.details) for relative, entry in page
+        ]
+        if len(window) > page_size:
+            lines.append(f"[More entries. Continue with cursor={page[-1][0]}.]")
+        return "Directory listing:\n" + "\n".join(lines)
     except Exception as e:
         return f"Error listing directory '{args.path}': {e}"
 
 
+def _load_ignore_patterns(root: str) -> List[str]:
+    """Reads the glob patterns of the root's .gitignore. Negations are not
+    supported and are dropped.
+    """
+    try:
+        with open(os.path.join(root, ".gitignore"), "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        return []
+    return [
+        line.rstrip("/") for line in lines if line and not line.startswith(("#", "!"))
+    ]
+
+
+def _is_ignored(relative: str, name: str, patterns: List[str]) -> bool:
+    """Tells whether an entry matches one of the ignore patterns."""
+    for pattern in patterns:
+        if pattern.startswith("/") or "/" in pattern:
+            if fnmatch.fnmatch(relative, pattern.lstrip("/")):
+                return True
+        elif fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+def _iter_search_files(
+    root: str, glob: Optional[str], max_bytes: int
+) -> Iterator[Tuple[str, str]]:
+    """Streams (path, relative path) for the files search_files should read,
+    in a stable order so that cursors stay valid between calls.
+    """
+    patterns = _load_ignore_patterns(root)
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            relative = prefix + entry.name
+            if entry.name.startswith(".") or _is_ignored(
+                relative, entry.name, patterns
+            ):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SEARCH_IGNORED_DIRS:
+                    subdirectories.append((entry.path, relative + "/"))
+            elif (
+                entry.is_file(follow_symlinks=False)
+                and (glob is None or fnmatch.fnmatch(entry.name, glob))
+                and entry.stat(follow_symlinks=False).st_size <= max_bytes
+            ):
+                yield entry.path, relative
+        # Pushed in reverse so that subdirectories are visited in name order.
+        stack.extend(reversed(subdirectories))
+
+
+def _search_order(relative: str) -> Tuple[Tuple[int, str], ...]:
+    """Sort key matching the order `_iter_search_files` yields files in: by
+    name within a directory, with its files before its subdirectories.
+    """
+    *directories, name = relative.split("/")
+    return tuple((1, directory) for directory in directories) + ((0, name),)
+
+
+def _parse_cursor(cursor: str) -> Tuple[str, int]:
+    """Splits a search cursor into the file to resume at and the number of
+    that file's matches already returned.
+    """
+    relative, _, shown = cursor.rpartition("#")
+    if not relative or not shown.isdigit():
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    return relative, int(shown)
+
+
+def _resume_files(
+    files: Iterator[Tuple[str, str]], relative: str
+) -> Iterator[Tuple[str, str]]:
+    """Passes over the files before `relative` without reading them."""
+    key = _search_order(relative)
+    return itertools.dropwhile(lambda item: _search_order(item[1]) < key, files)
+
+
+def _grep_file(
+    path: str, relative: str, regex: "re.Pattern[bytes]", context_lines: int
+) -> List[str]:
+    """Worker process: returns one formatted block per matching line of a file.
+    Binary and unreadable files yield no matches.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    # One scan of the whole file rules out most files before splitting lines.
+    if b"\x00" in data[:BINARY_SNIFF_BYTES] or not regex.search(data):
+        return []
+
+    lines = data.split(b"\n")
+    blocks = []
+    for index, line in enumerate(lines):
+        if not regex.search(line):
+            continue
+        first = max(0, index - context_lines)
+        last = min(len(lines), index + context_lines + 1)
+        blocks.append(
+            "\n".join(
+                f"{relative}{':' if i == index else '-'}{i + 1}: "
+                f"{_decode(lines[i]).rstrip()[:MAX_MATCH_LINE_CHARS]}"
+                for i in range(first, last)
+            )
+        )
+    return blocks
+
+
+def _collect_matches(
+    files: Iterator[Tuple[str, str]],
+    regex: "re.Pattern[bytes]",
+    context_lines: int,
+    wanted: int,
+    workers: int,
+    resume: Optional[Tuple[str, int]] = None,
+) -> List[Tuple[str, int, str]]:
+    """Greps files on a process pool, a batch at a time, until at least
+    `wanted` matches are found or the files run out. Returns (relative path,
+    index of the match in its file, block), in file order. `resume` is a file
+    and the number of its matches already returned, which are left out.
+    """
+    pool = get_process_pool("file-search", workers)
+    matches: List[Tuple[str, int, str]] = []
+    while len(matches) < wanted:
+        batch = list(itertools.islice(files, workers * 4))
+        if not batch:
+            break
+        results = pool.map(
+            _grep_file,
+            [path for path, _ in batch],
+            [relative for _, relative in batch],
+            itertools.repeat(regex),
+            itertools.repeat(context_lines),
+        )
+        for (_, relative), blocks in zip(batch, results):
+            shown = resume[1] if resume and resume[0] == relative else 0
+            matches.extend(
+                (relative, index, block)
+                for index, block in enumerate(blocks)
+                if index >= shown
+            )
+    return matches
+
+
+def _format_page(
+    matches: List[Tuple[str, int, str]], page_size: int, max_bytes: int
+) -> List[str]:
+    """Returns the blocks of one page of matches, within `max_bytes`, followed
+    by the cursor of the first match left out, if any.
+    """
+    output: List[str] = []
+    used = 0
+    for _, _, block in matches[:page_size]:
+        if output and used + len(block) > max_bytes:
+            break
+        output.append(block)
+        used += len(block) + 1
+    if len(output) < len(matches):
+        relative, index, _ = matches[len(output)]
+        output.append(f"[More matches. Continue with cursor={relative}#{index}.]")
+    return output
+
+
+def search_files(args: SearchFilesArgs) -> str:
+    """Searches the files under a directory for text or a regular expression,
+    scanning files in parallel worker processes. Returns matching lines as
+    'path:line: text', one page at a time. Hidden, binary, very large and
+    .gitignore'd files are skipped.
+    """
+    try:
+        root = Path(args.path)
+        if not root.is_dir():
+            return f"Error: '{args.path}' is not a valid directory."
+        settings = get_settings()
+        page_size = settings.file_search_max_matches
+        pattern = args.query if args.regex else re.escape(args.query)
+        regex = re.compile(
+            pattern.encode("utf-8"), 0 if args.case_sensitive else re.IGNORECASE
+        )
+
+        files = _iter_search_files(
+            str(root), args.glob, settings.file_search_max_file_bytes
+        )
+        resume = None
+        if args.cursor:
+            resume = _parse_cursor(args.cursor)
+            files = _resume_files(files, resume[0])
+        # One match past the page tells whether another page exists.
+        matches = _collect_matches(
+            files,
+            regex,
+            args.context_lines,
+            page_size + 1,
+            settings.file_search_workers,
+            resume,
+        )
+        if not matches:
+            if args.cursor:
+                return f"No more matches after cursor {args.cursor}."
+            return f"No matches for '{args.query}' in '{args.path}'."
+        output = _format_page(matches, page_size, settings.file_read_max_bytes)
+        return ("\n--\n" if args.context_lines else "\n").join(output)
+    except re.error as e:
+        return f"Error: Invalid regular expression '{args.query}': {e}"
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error searching '{args.path}': {e}"
+
+
 def create_directory(args: CreateDirectoryArgs) -> str:
     """Creates a new directory at the specified path."""
     try:
@@ -107,3 +852,57 @@ def delete_file_or_directory(args: DeleteArgs) -> str:
             return f"Error: Path '{args.path}' is neither a file nor a directory."
     except Exception as e:
         return f"Error deleting '{args.path}': {e}"
+
+
+def _apply_operation(operation: FileOperation) -> str:
+    """Performs one batch operation, returning a short description of the
+    outcome. Raises on failure.
+    """
+    path = Path(operation.path)
+    if operation.op in ("write", "append"):
+        if operation.content is None:
+            raise ValueError(f"'{operation.op}' requires content")
+        if operation.op == "write":
+            return f"{_format_size(_atomic_write(path, operation.content))} written"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(operation.content)
+        return "appended"
+    if operation.op == "mkdir":
+        path.mkdir(parents=True, exist_ok=True)
+        return "created"
+    if operation.op == "move":
+        if not operation.destination:
+            raise ValueError("'move' requires a destination")
+        destination = Path(operation.destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(path, destination)
+        return f"moved to {operation.destination}"
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+    return "deleted"
+
+
+def batch_file_operations(args: BatchFileOperationsArgs) -> str:
+    """Performs several file operations (write, append, mkdir, move, delete) in
+    order, in a single call. Writes are atomic. Returns one line per operation.
+    """
+    lines = []
+    succeeded = failed = 0
+    for number, operation in enumerate(args.operations, start=1):
+        label = f"{number}. {operation.op} {operation.path}"
+        if failed and args.stop_on_error:
+            lines.append(f"{label}: skipped")
+            continue
+        try:
+            lines.append(f"{label}: {_apply_operation(operation)}")
+            succeeded += 1
+        except Exception as e:
+            failed += 1
+            lines.append(f"{label}: FAILED ({e})")
+    summary = f"{succeeded}/{len(lines)} operation(s) succeeded"
+    if failed:
+        summary += f", {failed} failed"
+    return summary + ".\n" + "\n".join(lines)
@@ -1,6 +1,12 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 import chromadb
+import numpy as np
 from chromadb.utils.embedding_functions import (
     EmbeddingFunction,
     OllamaEmbeddingFunction,
@@ -11,6 +17,9 @@ from pydantic import BaseModel, Field
 
 from valai.config import get_settings
 from valai.core.console import console
+from valai.core.executors import get_executor, run_blocking
+from valai.core.tenancy import current_tenant
+from valai.core.tokens import estimate_tokens, truncate_to_tokens
 
 
 class AddDocumentArgs(BaseModel):
@@ -65,24 +74,125 @@ def get_embedding_function() -> EmbeddingFunction:
         raise ValueError(f"Unsupported embedding provider: {provider}")
 
 
+# The shared collection used when no tenant is bound (e.g. the CLI).
+DEFAULT_COLLECTION_NAME = "valai-knowledge-base"
+TENANT_COLLECTION_PREFIX = "valai-kb-"
+
+# How often a tenant collection's `last_used` metadata is refreshed, in seconds.
+LAST_USED_RESOLUTION = 3600
+
+_open_collections: "OrderedDict[str, chromadb.Collection]" = OrderedDict()
+_last_touched: Dict[str, float] = {}
+_open_collections_lock = threading.Lock()
+_client_lock = threading.Lock()
+
+
 @lru_cache(maxsize=1)
-def get_collection() -> chromadb.Collection:
-    """Initializes and returns a cached instance of the ChromaDB collection."""
+def _create_client(client_path: str) -> chromadb.ClientAPI:
+    return chromadb.PersistentClient(path=client_path)
+
+
+def get_client() -> chromadb.ClientAPI:
+    """Returns a cached ChromaDB persistent client. Creation is serialized because
+    Chroma does not support opening the same path concurrently from several threads.
+    """
     client_path = get_settings().chroma_db_path
     if not client_path:
         raise ValueError("The chroma_db_path must be set in the configuration.")
+    with _client_lock:
+        return _create_client(client_path)
+
+
+def tenant_collection_name(tenant_id: Optional[str]) -> str:
+    """Maps a tenant to its collection name. Tenant IDs are hashed because
+    Chroma restricts collection names to a small character set.
+    """
+    if not tenant_id:
+        return DEFAULT_COLLECTION_NAME
+    digest = hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:16]
+    return f"{TENANT_COLLECTION_PREFIX}{digest}"
+
 
+def _touch(name: str, tenant_id: str, collection: chromadb.Collection):
+    """Records when a tenant collection was last used, at most once per
+    `LAST_USED_RESOLUTION`, so idle tenants can be pruned by maintenance.
+    """
+    now = time.time()
+    if now - _last_touched.get(name, 0.0) < LAST_USED_RESOLUTION:
+        return
+    _last_touched[name] = now
     try:
-        client = chromadb.PersistentClient(path=client_path)
-        embedding_function = get_embedding_function()
-        collection = client.get_or_create_collection(
-            name="valai-knowledge-base", embedding_function=embedding_function
-        )
-        logger.success("ChromaDB collection loaded successfully.")
-        return collection
+        collection.modify(metadata={"tenant": tenant_id, "last_used": now})
     except Exception as e:
-        logger.critical(f"Failed to initialize ChromaDB collection: {e}")
-        raise
+        logger.warning(f"Could not record last use of collection '{name}': {e}")
+
+
+def get_collection(tenant_id: Optional[str] = None) -> chromadb.Collection:
+    """Returns the ChromaDB collection for a tenant, defaulting to the tenant bound
+    to the current session; an empty string selects the shared collection. Each
+    tenant has its own collection, so query cost depends only on that tenant's
+    data. Open handles are kept in a bounded LRU.
+    """
+    if tenant_id is None:
+        tenant_id = current_tenant.get()
+    name = tenant_collection_name(tenant_id)
+
+    with _open_collections_lock:
+        collection = _open_collections.get(name)
+        if collection is not None:
+            _open_collections.move_to_end(name)
+        else:
+            # Opening is a cheap local operation, so it is done under the lock to
+            # avoid racing get_or_create calls for the same tenant.
+            try:
+                collection = get_client().get_or_create_collection(
+                    name=name,
+                    embedding_function=get_embedding_function(),
+                    metadata={"tenant": tenant_id, "last_used": time.time()}
+                    if tenant_id
+                    else None,
+                )
+                logger.success(f"ChromaDB collection '{name}' loaded successfully.")
+            except Exception as e:
+                logger.critical(f"Failed to initialize ChromaDB collection: {e}")
+                raise
+
+            _open_collections[name] = collection
+            max_open = get_settings().knowledge_max_open_collections
+            while len(_open_collections) > max_open:
+                _open_collections.popitem(last=False)
+        if tenant_id:
+            _touch(name, tenant_id, collection)
+    return collection
+
+
+def get_readable_collections() -> List[chromadb.Collection]:
+    """Returns the collections the current tenant may search: its own and, for
+    a bound tenant, the shared knowledge base that `valai ingest` fills.
+    """
+    tenant_id = current_tenant.get()
+    collections = [get_collection(tenant_id)]
+    if tenant_id:
+        collections.append(get_collection(""))
+    return collections
+
+
+def drop_collection(name: str):
+    """Deletes a collection and forgets any open handle to it."""
+    with _open_collections_lock:
+        _open_collections.pop(name, None)
+        _last_touched.pop(name, None)
+        get_client().delete_collection(name=name)
+
+
+def list_collection_names() -> List[str]:
+    """Returns the names of the shared collection and every tenant collection."""
+    return [
+        collection.name
+        for collection in get_client().list_collections()
+        if collection.name == DEFAULT_COLLECTION_NAME
+        or collection.name.startswith(TENANT_COLLECTION_PREFIX)
+    ]
 
 
 def add_document_to_knowledge_base(args: AddDocumentArgs) -> str:
@@ -91,7 +201,11 @@ def add_document_to_knowledge_base(args: AddDocumentArgs) -> str:
     """
     try:
         collection = get_collection()
-        collection.upsert(documents=[args.content], ids=[args.doc_id])
+        collection.upsert(
+            documents=[args.content],
+            ids=[args.doc_id],
+            metadatas=[{"added_at": time.time()}],
+        )
         logger.info(f"Upserted document with ID '{args.doc_id}' into knowledge base.")
         return f"Document '{args.doc_id}' has been successfully added/updated."
     except Exception as e:
@@ -109,15 +223,124 @@ def add_document_to_knowledge_base(args: AddDocumentArgs) -> str:
         return f"An unexpected error occurred while adding a document: {e}"
 
 
+def _mmr_rank(
+    query_embedding: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float,
+) -> List[int]:
+    """Orders candidates by maximal marginal relevance.
+
+    Each step picks the candidate that best balances similarity to the query
+    against its highest similarity to anything already picked, so near-duplicates
+    of a selected document sink to the bottom.
+
+    Args:
+        query_embedding: The embedding of the query.
+        embeddings: The embeddings of the candidate documents.
+        k: The number of candidates to select.
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity.
+
+    Returns:
+        Indices into `embeddings`, best first.
+
+    """
+    docs = np.asarray(embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    docs /= np.linalg.norm(docs, axis=1, keepdims=True) + 1e-12
+    query /= np.linalg.norm(query) + 1e-12
+
+    relevance = docs @ query
+    similarity = docs @ docs.T
+    k = min(k, len(docs))
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+
+def _pack_results(results: List[tuple[str, str]], token_budget: int) -> List[str]:
+    """Greedily packs (source, document) pairs, in order, into the token budget.
+    The first result is truncated rather than dropped if it alone exceeds the budget.
+    """
+    packed: List[str] = []
+    remaining = token_budget
+    for source, document in results:
+        entry = f"[source: {source}]\n{document}"
+        cost = estimate_tokens(entry)
+        if cost > remaining:
+            if packed:
+                continue
+            entry = truncate_to_tokens(entry, remaining)
+            cost = estimate_tokens(entry)
+        packed.append(entry)
+        remaining -= cost
+    return packed
+
+
+def _query_candidates(
+    collections: List[chromadb.Collection],
+    query_embedding: Sequence[float],
+    n_results: int,
+) -> tuple[List[str], List[str], List[Optional[dict]], List[Sequence[float]]]:
+    """Queries each collection and returns the combined candidates as
+    (ids, documents, metadatas, embeddings) lists.
+    """
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for collection in collections:
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not results.get("documents") or not results["documents"][0]:
+            continue
+        found = results["ids"][0]
+        ids.extend(found)
+        documents.extend(results["documents"][0])
+        metadatas.extend((results.get("metadatas") or [[None] * len(found)])[0])
+        found_embeddings = results.get("embeddings")
+        if found_embeddings is not None:
+            embeddings.extend(found_embeddings[0])
+    return ids, documents, metadatas, embeddings
+
+
 def search_knowledge_base(args: SearchKnowledgeArgs) -> str:
     """Searches the knowledge base for information relevant to the user's query."""
+    settings = get_settings()
     try:
-        collection = get_collection()
-        results = collection.query(query_texts=[args.query], n_results=3)
-        documents = results.get("documents")
-        if not documents or not documents[0]:
+        collections = get_readable_collections()
+        query_embedding = get_embedding_function()([args.query])[0]
+        ids, documents, metadatas, embeddings = _query_candidates(
+            collections, query_embedding, settings.knowledge_candidate_pool
+        )
+        if not documents:
             return "No relevant information found in the knowledge base."
-        return "\n---\n".join(documents[0])
+
+        if len(embeddings) == len(documents):
+            order = _mmr_rank(
+                query_embedding,
+                embeddings,
+                k=settings.knowledge_max_results,
+                lambda_mult=settings.knowledge_mmr_lambda,
+            )
+        else:
+            order = list(range(min(settings.knowledge_max_results, len(documents))))
+
+        ranked = [
+            ((metadatas[i] or {}).get("source", ids[i]), documents[i]) for i in order
+        ]
+        packed = _pack_results(ranked, settings.knowledge_token_budget)
+        logger.info(
+            f"Knowledge search returned {len(packed)} of {len(documents)} candidate(s)."
+        )
+        return "\n---\n".join(packed)
     except Exception as e:
         logger.opt(exception=True).error(
             f"Unexpected error in search_knowledge_base: {e}"
@@ -128,11 +351,48 @@ def search_knowledge_base(args: SearchKnowledgeArgs) -> str:
 def get_knowledge_base_stats() -> str:
     """Returns statistics about the knowledge base, such as the number of documents."""
     try:
-        collection = get_collection()
-        count = collection.count()
+        count = sum(c.count() for c in get_readable_collections())
         return f"The knowledge base currently contains {count} document(s)."
     except Exception as e:
         logger.opt(exception=True).error(
             f"Unexpected error in get_knowledge_base_stats: {e}"
         )
         return f"An unexpected error occurred: {e}"
+
+
+async def _run_knowledge_task(func: Callable[..., str], *args: Any) -> str:
+    """Runs a blocking knowledge base tool on the bounded knowledge executor,
+    giving up after the configured timeout so a slow embedding backend cannot
+    hold the caller indefinitely.
+    """
+    settings = get_settings()
+    executor = get_executor("knowledge", settings.knowledge_max_workers)
+    try:
+        return await run_blocking(
+            executor, func, *args, timeout=settings.knowledge_timeout_seconds
+        )
+    except TimeoutError:
+        logger.error(
+            f"{func.__name__} timed out after {settings.knowledge_timeout_seconds}s."
+        )
+        return (
+            "Error: The knowledge base did not respond within "
+            f"{settings.knowledge_timeout_seconds:g} seconds. Please try again later."
+        )
+
+
+async def add_document_to_knowledge_base_async(args: AddDocumentArgs) -> str:
+    """Learns from a document by adding it to the knowledge base.
+    If a document with the same ID already exists, it will be updated.
+    """
+    return await _run_knowledge_task(add_document_to_knowledge_base, args)
+
+
+async def search_knowledge_base_async(args: SearchKnowledgeArgs) -> str:
+    """Searches the knowledge base for information relevant to the user's query."""
+    return await _run_knowledge_task(search_knowledge_base, args)
+
+
+async def get_knowledge_base_stats_async() -> str:
+    """Returns statistics about the knowledge base, such as the number of documents."""
+    return await _run_knowledge_task(get_knowledge_base_stats)
@@ -1,13 +1,54 @@
 import json
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import List
 
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from valai.core.storage import open_database
+
+NOTES_DB = Path("notes.db")
+# Notes used to be stored as a single JSON document; it is migrated on first use.
 NOTES_FILE = Path("notes.json")
 
+NOTES_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    """,
+    # Full-text index over the notes table, kept in sync by triggers.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+        title, content, content='notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO notes_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END;
+    INSERT INTO notes_fts(notes_fts) VALUES ('rebuild');
+    """,
+]
+
+# BM25 column weights: a match in the title counts more than one in the body.
+TITLE_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
 
 class Note(BaseModel):
     """Data model for a single note."""
@@ -29,8 +70,20 @@ class SearchNotesArgs(BaseModel):
     """Input model for the search_notes tool."""
 
     query: str = Field(
-        ..., description="The text to search for in note titles and content."
+        ..., description="The words to search for in note titles and content."
+    )
+    limit: int = Field(
+        5, description="Maximum number of results to return.", gt=0, le=25
     )
+    page: int = Field(
+        1, description="The page of results to return, starting at 1.", gt=0
+    )
+
+
+class GetNoteArgs(BaseModel):
+    """Input model for the get_note tool."""
+
+    note_id: int = Field(..., description="The unique ID of the note to read.")
 
 
 class DeleteNoteArgs(BaseModel):
@@ -39,84 +92,137 @@ class DeleteNoteArgs(BaseModel):
     note_id: int = Field(..., description="The unique ID of the note to delete.")
 
 
-def _load_notes() -> List[Note]:
-    """Loads notes from the JSON file."""
+def _migrate_legacy_notes():
+    """Imports notes from the legacy JSON file, once. The file is renamed
+    afterwards so the migration never runs again.
+    """
     if not NOTES_FILE.exists():
-        return []
+        return
     try:
         with open(NOTES_FILE, "r", encoding="utf-8") as f:
-            notes_data = json.load(f)
-            return [Note(**note) for note in notes_data]
+            notes = [Note(**note) for note in json.load(f)]
     except (json.JSONDecodeError, IOError) as e:
-        logger.error(f"Error loading notes file: {e}")
-        return []
+        logger.error(f"Error loading legacy notes file for migration: {e}")
+        return
+
+    with open_database(NOTES_DB, NOTES_MIGRATIONS) as conn:
+        # Original IDs are kept, and re-running after a crash is harmless.
+        conn.executemany(
+            "INSERT OR IGNORE INTO notes (id, title, content, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(n.id, n.title, n.content, n.created_at.isoformat()) for n in notes],
+        )
+    try:
+        NOTES_FILE.rename(NOTES_FILE.with_suffix(".json.migrated"))
+    except FileNotFoundError:
+        pass  # Another process finished the migration first.
+    logger.success(f"Migrated {len(notes)} note(s) from {NOTES_FILE} to {NOTES_DB}.")
 
 
-def _save_notes(notes: List[Note]):
-    """Saves a list of notes to the JSON file."""
-    try:
-        with open(NOTES_FILE, "w", encoding="utf-8") as f:
-            notes_data = [note.model_dump(mode="json") for note in notes]
-            json.dump(notes_data, f, indent=4)
-    except IOError as e:
-        logger.error(f"Error saving notes file: {e}")
+def _notes_db():
+    """Opens the notes database, migrating legacy JSON notes on first use."""
+    _migrate_legacy_notes()
+    return open_database(NOTES_DB, NOTES_MIGRATIONS)
 
 
 def save_note(args: SaveNoteArgs) -> str:
     """Use this tool to save a new note."""
-    notes = _load_notes()
-    new_id = (max(note.id for note in notes) + 1) if notes else 1
-    new_note = Note(
-        id=new_id,
-        title=args.title,
-        content=args.content,
-        created_at=datetime.now(),
-    )
-    notes.append(new_note)
-    _save_notes(notes)
+    with _notes_db() as conn:
+        cursor = conn.execute(
+            "INSERT INTO notes (title, content, created_at) VALUES (?, ?, ?)",
+            (args.title, args.content, datetime.now().isoformat()),
+        )
+        new_id = cursor.lastrowid
     return f"Note '{args.title}' (ID: {new_id}) saved successfully."
 
 
 def retrieve_notes() -> str:
     """Use this tool to retrieve a summary of all previously saved notes."""
-    notes = _load_notes()
-    if not notes:
+    with _notes_db() as conn:
+        rows = conn.execute(
+            "SELECT id, title, created_at FROM notes ORDER BY id"
+        ).fetchall()
+    if not rows:
         return "No notes found."
     summaries = [
-        f"- ID {note.id}: {note.title} (Created: {note.created_at.strftime('%Y-%m-%d %H:%M')})"
-        for note in notes
+        f"- ID {row['id']}: {row['title']} (Created: {datetime.fromisoformat(row['created_at']).strftime('%Y-%m-%d %H:%M')})"
+        for row in rows
     ]
     return "Here are your notes:\n" + "\n".join(summaries)
 
 
+def _fts_query(query: str, operator: str) -> str:
+    """Turns free text into an FTS5 query of quoted prefix terms, so user input
+    can never be parsed as FTS syntax.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    return f" {operator} ".join(f'"{term}"*' for term in terms)
+
+
 def search_notes(args: SearchNotesArgs) -> str:
-    """Searches for notes containing the query text in their title or content."""
-    notes = _load_notes()
-    if not notes:
-        return "No notes to search."
-
-    query_lower = args.query.lower()
-    found_notes = [
-        note
-        for note in notes
-        if query_lower in note.title.lower() or query_lower in note.content.lower()
-    ]
+    """Searches notes by title and content and returns the best matches, ranked by
+    relevance, with the matching words highlighted. Use `get_note` to read a
+    result in full, or request the next `page` for more results.
+    """
+    if not re.search(r"\w", args.query):
+        return "Error: Please provide words to search for."
+
+    offset = (args.page - 1) * args.limit
+    with _notes_db() as conn:
+        # Prefer notes containing every term; fall back to any term.
+        for operator in ("AND", "OR"):
+            match = _fts_query(args.query, operator)
+            total = conn.execute(
+                "SELECT count(*) FROM notes_fts WHERE notes_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            if total:
+                break
+        if not total:
+            return f"No notes found matching '{args.query}'."
+
+        rows = conn.execute(
+            "SELECT rowid AS id, "
+            "highlight(notes_fts, 0, '**', '**') AS title, "
+            "snippet(notes_fts, 1, '**', '**', ' … ', 24) AS snippet "
+            "FROM notes_fts WHERE notes_fts MATCH ? "
+            "ORDER BY bm25(notes_fts, ?, ?) LIMIT ? OFFSET ?",
+            (match, TITLE_WEIGHT, CONTENT_WEIGHT, args.limit, offset),
+        ).fetchall()
+
+    if not rows:
+        return f"No more results: '{args.query}' matched {total} note(s)."
+
+    results = [f"ID {row['id']}: {row['title']}\n{row['snippet']}" for row in rows]
+    shown = f"{offset + 1}-{offset + len(rows)}"
+    more = (
+        f" Request page {args.page + 1} for more." if offset + len(rows) < total else ""
+    )
+    return (
+        f"Found {total} matching note(s), showing {shown}.{more}\n\n"
+        + "\n---\n".join(results)
+    )
 
-    if not found_notes:
-        return f"No notes found matching '{args.query}'."
 
-    results = [f"ID {note.id}: {note.title}\n{note.content}" for note in found_notes]
-    return "Found matching notes:\n\n" + "\n---\n".join(results)
+def get_note(args: GetNoteArgs) -> str:
+    """Returns the full title and content of a single note by its ID."""
+    with _notes_db() as conn:
+        row = conn.execute(
+            "SELECT id, title, content, created_at FROM notes WHERE id = ?",
+            (args.note_id,),
+        ).fetchone()
+    if row is None:
+        return f"Error: Note with ID {args.note_id} not found."
+    created = datetime.fromisoformat(row["created_at"]).strftime("%Y-%m-%d %H:%M")
+    return f"ID {row['id']}: {row['title']} (Created: {created})\n{row['content']}"
 
 
 def delete_note(args: DeleteNoteArgs) -> str:
     """Deletes a specific note by its ID."""
-    notes = _load_notes()
-    note_to_delete = next((note for note in notes if note.id == args.note_id), None)
-
-    if not note_to_delete:
-        return f"Error: Note with ID {args.note_id} not found."
-
-    notes.remove(note_to_delete)
-    _save_notes(notes)
-    return f"Successfully deleted note ID {args.note_id} ('{note_to_delete.title}')."
+    with _notes_db() as conn:
+        row = conn.execute(
+            "SELECT title FROM notes WHERE id = ?", (args.note_id,)
+        ).fetchone()
+        if row is None:
+            return f"Error: Note with ID {args.note_id} not found."
+        conn.execute("DELETE FROM notes WHERE id = ?", (args.note_id,))
+    return f"Successfully deleted note ID {args.note_id} ('{row['title']}')."
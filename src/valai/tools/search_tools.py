@@ -1,11 +1,13 @@
-from typing import Optional
+from typing import Dict, List
 
-from duckduckgo_search import DDGS
 from loguru import logger
 from pydantic import BaseModel, Field
-from tavily import TavilyClient
 
 from valai.config import get_settings
+from valai.core.passages import Passage, rank_passages, split_passages
+from valai.core.search import SearchResult, format_results, search
+from valai.core.tokens import estimate_tokens
+from valai.tools.webscraping_tools import scrape_pages
 
 
 class WebSearchArgs(BaseModel):
@@ -14,48 +16,88 @@ class WebSearchArgs(BaseModel):
     query: str = Field(..., description="The search query.")
 
 
-def _tavily_search(query: str) -> Optional[str]:
-    """Performs a search using the Tavily API."""
-    logger.info(f"Attempting search with Tavily for query: '{query}'")
-    settings = get_settings()
-    if not settings.tavily_api_key:
-        logger.warning("Tavily API key is not configured.")
-        return None
-    try:
-        client = TavilyClient(api_key=settings.tavily_api_key)
-        response = client.search(query=query, max_results=5)
-        return str(response.get("results", "No results found."))
-    except Exception as e:
-        logger.error(f"Error searching Tavily: {e}")
-        return None
-
-
-def _ddg_search(query: str) -> str:
-    """Performs a search using the DuckDuckGo API."""
-    logger.info(f"Attempting search with DuckDuckGo for query: '{query}'")
-    try:
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query, max_results=5)]
-            return str(results) if results else "No results found."
-    except Exception as e:
-        logger.error(f"Error searching DuckDuckGo: {e}")
-        return f"Error during DuckDuckGo search: {e}"
-
-
-def web_search(args: WebSearchArgs) -> str:
+class DeepSearchArgs(BaseModel):
+    """Input model for the deep_search tool."""
+
+    query: str = Field(..., description="The question or search query.")
+
+
+async def web_search(args: WebSearchArgs) -> str:
     """Use this tool to search the web for up-to-date information.
-    It first tries a high-quality search provider (Tavily) and falls back to a standard one (DuckDuckGo).
+    It queries a high-quality search provider (Tavily) and a standard one (DuckDuckGo) at the same time,
+    and returns de-duplicated results as a numbered list of titles, URLs and snippets.
+    """
+    if not args.query:
+        return "Error: Please provide a search query."
+
+    results = await search(args.query)
+    if not results:
+        return "No results found."
+    return format_results(results)
+
+
+async def _read_results(results: List[SearchResult]) -> List[Passage]:
+    """Fetches every result page concurrently and splits it into passages.
+    A result whose page cannot be read contributes its snippet instead.
+    """
+    settings = get_settings()
+    pages = await scrape_pages(
+        [result.url for result in results],
+        settings.scrape_token_budget,
+        include_links=False,
+    )
+    passages = []
+    for source, (result, text) in enumerate(zip(results, pages), start=1):
+        if isinstance(text, Exception):
+            logger.warning(f"deep_search could not read '{result.url}': {text}")
+            text = result.snippet
+        passages.extend(
+            split_passages(text, source, settings.deep_search_passage_tokens)
+        )
+    return passages
+
+
+def _select(ranked: List[Passage]) -> List[Passage]:
+    """Picks the best passages within the token budget, at most
+    `deep_search_passages_per_page` from any one page.
+    """
+    settings = get_settings()
+    budget = settings.deep_search_token_budget
+    per_source: Dict[int, int] = {}
+    selected = []
+    for passage in ranked:
+        cost = estimate_tokens(passage.text) + 5
+        if per_source.get(passage.source, 0) >= settings.deep_search_passages_per_page:
+            continue
+        if cost > budget:
+            continue
+        per_source[passage.source] = per_source.get(passage.source, 0) + 1
+        selected.append(passage)
+        budget -= cost
+    return selected
+
+
+async def deep_search(args: DeepSearchArgs) -> str:
+    """Use this tool to answer a question from the web in one step.
+    It searches the web, reads the top result pages at the same time, and returns the
+    passages most relevant to the query, each citing its source by number, followed
+    by the numbered list of sources. Prefer it over web_search followed by scrape_url.
     """
     if not args.query:
         return "Error: Please provide a search query."
 
-    # Try Tavily first
-    tavily_result = _tavily_search(args.query)
-    if tavily_result:
-        return tavily_result
+    results = await search(args.query, get_settings().deep_search_pages)
+    if not results:
+        return "No results found."
+    passages = _select(rank_passages(args.query, await _read_results(results)))
+    if not passages:
+        return "No relevant passages found. Search results:\n\n" + format_results(
+            results
+        )
 
-    # Fallback to DuckDuckGo
-    logger.warning(
-        "Tavily search failed or was unavailable. Falling back to DuckDuckGo."
+    body = "\n\n".join(f"[{p.source}] {p.text}" for p in passages)
+    cited = sorted({p.source for p in passages})
+    sources = "\n".join(
+        f"[{n}] {results[n - 1].title} - {results[n - 1].url}" for n in cited
     )
-    return _ddg_search(args.query)
+    return f"{body}\n\nSources:\n{sources}"
@@ -1,35 +1,97 @@
 import datetime
+from typing import Callable, List, Tuple
 
-import psutil
 from loguru import logger
 
+from valai.config import get_settings
+from valai.core.system_metrics import (
+    SUMMARY_WINDOWS,
+    MetricsSample,
+    start_metrics_sampler,
+    summarize,
+)
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _windows(samples: List[MetricsSample]) -> List[Tuple[str, List[MetricsSample]]]:
+    """Returns the summary windows the sample history covers, labelled."""
+    span = samples[-1].timestamp - samples[0].timestamp
+    interval = get_settings().system_metrics_interval_seconds
+    windows = []
+    for seconds in SUMMARY_WINDOWS:
+        if seconds <= span + interval:
+            since = samples[-1].timestamp - seconds
+            windows.append(
+                (f"{seconds // 60}m", [s for s in samples if s.timestamp >= since])
+            )
+    if not windows and len(samples) > 1:
+        windows.append((f"{span:.0f}s", samples))
+    return windows
+
+
+def _trend(
+    windows: List[Tuple[str, List[MetricsSample]]],
+    value: Callable[[MetricsSample], float],
+    render: Callable[[float], str],
+) -> str:
+    """Renders ' | 1m: min a, avg b, max c | 5m: ...' summaries of a metric."""
+    parts = []
+    for label, samples in windows:
+        low, mean, high = summarize(samples, value)
+        parts.append(
+            f" | {label}: min {render(low)}, avg {render(mean)}, max {render(high)}"
+        )
+    return "".join(parts)
+
 
 def get_system_metrics() -> str:
-    """Retrieves current system metrics including CPU usage, memory usage, and disk space.
-    Use this tool to check the health and status of the local machine.
+    """Retrieves current system metrics including CPU usage, memory usage, disk space,
+    network throughput and the assistant's own process, with min/avg/max over the last
+    1, 5 and 15 minutes. Use this tool to check the health and status of the local machine.
     """
     try:
         logger.info("Fetching system metrics.")
-        # CPU Usage (with a 1-second interval for a more accurate reading)
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # Sampled in the background: answering never blocks on a CPU measurement.
+        sampler = start_metrics_sampler()
+        sampler.first_sample.wait(timeout=2)
+        samples = sampler.history()
+        if not samples:
+            return "System metrics are not available yet. Please try again shortly."
+
+        now = samples[-1]
+        windows = _windows(samples)
 
-        # Memory Usage
-        memory = psutil.virtual_memory()
-        # memory_percent = memory.percent
-        memory_used_gb = f"{memory.used / (1024**3):.2f} GB"
-        memory_total_gb = f"{memory.total / (1024**3):.2f} GB"
+        def percent(value: float) -> str:
+            return f"{value:.1f}%"
 
-        # Disk Usage (for the root partition)
-        disk = psutil.disk_usage("/")
-        # disk_percent = disk.percent
-        disk_free_gb = f"{disk.free / (1024**3):.2f} GB"
-        disk_total_gb = f"{disk.total / (1024**3):.2f} GB"
+        def rate(value: float) -> str:
+            return f"{_format_bytes(value)}/s"
 
         metrics = (
-            "System Metrics:\n"
-            f"- CPU Usage: {cpu_percent}%\n"
-            f"- Memory Usage: {memory_used_gb} / {memory_total_gb}\n"
-            f"- Disk Space: {disk_free_gb} free / {disk_total_gb} total"
+            "System Metrics (current value | summary per recent window):\n"
+            f"- CPU Usage: {percent(now.cpu_percent)}"
+            f"{_trend(windows, lambda s: s.cpu_percent, percent)}\n"
+            f"- Memory Usage: {_format_bytes(now.memory_used)} / "
+            f"{_format_bytes(now.memory_total)} ({percent(now.memory_percent)})"
+            f"{_trend(windows, lambda s: s.memory_percent, percent)}\n"
+            f"- Disk Space: {_format_bytes(now.disk_free)} free / "
+            f"{_format_bytes(now.disk_total)} total\n"
+            f"- Network Sent: {rate(now.net_sent_rate)}"
+            f"{_trend(windows, lambda s: s.net_sent_rate, rate)}\n"
+            f"- Network Received: {rate(now.net_recv_rate)}"
+            f"{_trend(windows, lambda s: s.net_recv_rate, rate)}\n"
+            f"- ValAI Process CPU: {percent(now.process_cpu_percent)}"
+            f"{_trend(windows, lambda s: s.process_cpu_percent, percent)}\n"
+            f"- ValAI Process Memory: {_format_bytes(now.process_rss)}, "
+            f"{now.process_threads} threads"
+            f"{_trend(windows, lambda s: s.process_rss, _format_bytes)}"
         )
         logger.success("Successfully fetched system metrics.")
         return metrics
@@ -1,13 +1,32 @@
 import json
+import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import List, Literal, Optional
+from typing import Literal, Optional
 
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from valai.core.storage import open_database
+
+TODO_DB = Path("todo_list.db")
+# To-dos used to be stored as a single JSON document; it is migrated on first use.
 TODO_FILE = Path("todo_list.json")
 
+TODO_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS todos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        created_at TEXT NOT NULL,
+        completed_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_todos_pending ON todos(status, id);
+    CREATE INDEX IF NOT EXISTS idx_todos_completed ON todos(status, completed_at);
+    """,
+]
+
 
 class TodoItem(BaseModel):
     """Data model for a single to-do item."""
@@ -31,76 +50,137 @@ class CompleteTodoArgs(BaseModel):
     task_id: int = Field(..., description="The unique ID of the task to mark as complete.")
 
 
-def _load_todos() -> List[TodoItem]:
-    """Loads the to-do list from the JSON file."""
+class ViewTodosArgs(BaseModel):
+    """Input model for the view_todos tool."""
+
+    status: Literal["all", "pending", "completed"] = Field(
+        "all", description="Which tasks to show: 'pending', 'completed' or 'all'."
+    )
+    page: int = Field(1, description="The page to show, starting at 1.", gt=0)
+    page_size: int = Field(
+        20, description="Maximum number of tasks per section.", gt=0, le=100
+    )
+
+
+def _migrate_legacy_todos():
+    """Imports to-dos from the legacy JSON file, once. The file is renamed
+    afterwards so the migration never runs again.
+    """
     if not TODO_FILE.exists():
-        return []
+        return
     try:
         with open(TODO_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return [TodoItem(**item) for item in data]
+            todos = [TodoItem(**item) for item in json.load(f)]
     except (json.JSONDecodeError, IOError) as e:
-        logger.error(f"Error loading to-do file: {e}")
-        return []
-
-
-def _save_todos(todos: List[TodoItem]):
-    """Saves the to-do list to the JSON file."""
+        logger.error(f"Error loading legacy to-do file for migration: {e}")
+        return
+
+    with open_database(TODO_DB, TODO_MIGRATIONS) as conn:
+        # Original IDs are kept, and re-running after a crash is harmless.
+        conn.executemany(
+            "INSERT OR IGNORE INTO todos (id, task, status, created_at, completed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    item.id,
+                    item.task,
+                    item.status,
+                    item.created_at.isoformat(),
+                    item.completed_at.isoformat() if item.completed_at else None,
+                )
+                for item in todos
+            ],
+        )
     try:
-        with open(TODO_FILE, "w", encoding="utf-8") as f:
-            data = [item.model_dump(mode="json") for item in todos]
-            json.dump(data, f, indent=4)
-    except IOError as e:
-        logger.error(f"Error saving to-do file: {e}")
+        TODO_FILE.rename(TODO_FILE.with_suffix(".json.migrated"))
+    except FileNotFoundError:
+        pass  # Another process finished the migration first.
+    logger.success(
+        f"Migrated {len(todos)} to-do item(s) from {TODO_FILE} to {TODO_DB}."
+    )
+
+
+def _todo_db(immediate: bool = False):
+    """Opens the to-do database, migrating the legacy JSON list on first use."""
+    _migrate_legacy_todos()
+    return open_database(TODO_DB, TODO_MIGRATIONS, immediate=immediate)
+
+
+def _render_section(
+    conn: sqlite3.Connection, status: str, order_by: str, args: ViewTodosArgs
+) -> Optional[str]:
+    """Renders one page of tasks with the given status, or None if there are none."""
+    total = conn.execute(
+        "SELECT count(*) FROM todos WHERE status = ?", (status,)
+    ).fetchone()[0]
+    if not total:
+        return None
+    offset = (args.page - 1) * args.page_size
+    rows = conn.execute(
+        f"SELECT id, task FROM todos WHERE status = ? ORDER BY {order_by} "
+        "LIMIT ? OFFSET ?",
+        (status, args.page_size, offset),
+    ).fetchall()
+    lines = [f"  - ID {row['id']}: {row['task']}" for row in rows]
+    if offset + len(rows) < total:
+        lines.append(f"  … {total - offset - len(rows)} more (page {args.page + 1}).")
+    elif not rows:
+        lines.append(f"  (no tasks on page {args.page})")
+    return f"({total}):\n" + "\n".join(lines)
 
 
 def add_todo(args: AddTodoArgs) -> str:
     """Adds a new task to the to-do list."""
-    todos = _load_todos()
-    new_id = (max(item.id for item in todos) + 1) if todos else 1
-    new_item = TodoItem(id=new_id, task=args.task, created_at=datetime.now())
-    todos.append(new_item)
-    _save_todos(todos)
+    with _todo_db() as conn:
+        cursor = conn.execute(
+            "INSERT INTO todos (task, created_at) VALUES (?, ?)",
+            (args.task, datetime.now().isoformat()),
+        )
+        new_id = cursor.lastrowid
     logger.info(f"Added new to-do item #{new_id}: '{args.task}'")
     return f"✅ To-do item added: '{args.task}' (ID: {new_id})."
 
 
-def view_todos() -> str:
-    """Displays all current to-do items, separated by status."""
-    todos = _load_todos()
-    if not todos:
-        return "Your to-do list is empty! ✨"
-
-    pending = [item for item in todos if item.status == "pending"]
-    completed = [item for item in todos if item.status == "completed"]
+def view_todos(args: ViewTodosArgs) -> str:
+    """Displays to-do items, separated by status. Pending tasks are listed oldest
+    first and completed tasks most recent first, one page at a time.
+    """
+    with _todo_db() as conn:
+        pending = None
+        completed = None
+        if args.status in ("all", "pending"):
+            pending = _render_section(conn, "pending", "id", args)
+        if args.status in ("all", "completed"):
+            completed = _render_section(conn, "completed", "completed_at DESC", args)
 
-    response = ""
-    if pending:
-        response += "📋 Pending Tasks:\n"
-        response += "\n".join([f"  - ID {item.id}: {item.task}" for item in pending])
-    else:
-        response += "👍 No pending tasks!"
+    if args.status == "all" and not pending and not completed:
+        return "Your to-do list is empty! ✨"
 
+    sections = []
+    if args.status in ("all", "pending"):
+        sections.append(
+            f"📋 Pending Tasks {pending}" if pending else "👍 No pending tasks!"
+        )
     if completed:
-        response += "\n\n✅ Completed Tasks:\n"
-        response += "\n".join([f"  - ID {item.id}: {item.task}" for item in completed])
-
-    return response
+        sections.append(f"✅ Completed Tasks {completed}")
+    elif args.status == "completed":
+        sections.append("No completed tasks yet.")
+    return "\n\n".join(sections)
 
 
 def complete_todo(args: CompleteTodoArgs) -> str:
     """Marks a specific to-do item as complete by its ID."""
-    todos = _load_todos()
-    task_to_complete = next((item for item in todos if item.id == args.task_id), None)
-
-    if not task_to_complete:
-        return f"❌ Error: To-do item with ID {args.task_id} not found."
-
-    if task_to_complete.status == "completed":
-        return f"👍 Task ID {args.task_id} is already marked as complete."
-
-    task_to_complete.status = "completed"
-    task_to_complete.completed_at = datetime.now()
-    _save_todos(todos)
-    logger.info(f"Completed to-do item #{args.task_id}: '{task_to_complete.task}'")
-    return f"🎉 Great job! Task ID {args.task_id} ('{task_to_complete.task}') has been marked as complete."
+    with _todo_db(immediate=True) as conn:
+        row = conn.execute(
+            "SELECT task, status FROM todos WHERE id = ?", (args.task_id,)
+        ).fetchone()
+        if row is None:
+            return f"❌ Error: To-do item with ID {args.task_id} not found."
+        if row["status"] == "completed":
+            return f"👍 Task ID {args.task_id} is already marked as complete."
+        conn.execute(
+            "UPDATE todos SET status = 'completed', completed_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), args.task_id),
+        )
+    logger.info(f"Completed to-do item #{args.task_id}: '{row['task']}'")
+    return f"🎉 Great job! Task ID {args.task_id} ('{row['task']}') has been marked as complete."
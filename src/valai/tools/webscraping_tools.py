@@ -1,7 +1,29 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import random
+from typing import List, Union
+
+import httpx
+from loguru import logger
 from pydantic import BaseModel, Field
 
+from valai.config import get_settings
+from valai.core.executors import get_executor, run_blocking
+from valai.core.extraction import extract_main_content
+from valai.core.http import fetch
+from valai.core.status import report_status
+from valai.core.tokens import truncate_to_tokens
+
+# Threads used to parse pages, so large documents never stall the event loop.
+PARSE_WORKERS = 4
+
+# Status codes worth retrying: rate limiting and temporary server trouble.
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Base delay, in seconds, of the exponential backoff between retries, and the
+# longest Retry-After we are willing to honor.
+RETRY_BASE_DELAY_SECONDS = 0.5
+MAX_RETRY_DELAY_SECONDS = 10.0
+
 
 class BrowseURLArgs(BaseModel):
     """Input model for the browse_url tool."""
@@ -9,30 +31,144 @@ class BrowseURLArgs(BaseModel):
     url: str = Field(..., description="The full URL of the webpage to browse.")
 
 
-def scrape_url(args: BrowseURLArgs) -> str:
-    """Fetches the content from a given URL, parses the HTML, and returns the clean text content.
-    Use this tool to read the content of a specific webpage for analysis or summarization.
-    """
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(args.url, headers=headers, timeout=15)
-        response.raise_for_status()
+class ScrapeURLsArgs(BaseModel):
+    """Input model for the scrape_urls tool."""
 
-        soup = BeautifulSoup(response.content, "html.parser")
+    urls: List[str] = Field(
+        ...,
+        description="The full URLs of the webpages to read.",
+        min_length=1,
+        max_length=10,
+    )
 
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
 
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        clean_text = "\n".join(chunk for chunk in chunks if chunk)
+async def _scrape(url: str, token_budget: int, include_links: bool = True) -> str:
+    """Fetches a page and returns its main content within `token_budget`,
+    with numbered links unless `include_links` is False.
 
-        return f"Successfully browsed URL '{args.url}'. Content:\n\n{clean_text}"
+    Raises:
+        httpx.HTTPError: If the page cannot be fetched.
+        ValueError: If the content type is not text.
 
-    except requests.exceptions.RequestException as e:
+    """
+    settings = get_settings()
+    response = await fetch(url, max_bytes=settings.scrape_max_bytes)
+    content_type = response.headers.get("content-type", "").lower()
+    if not content_type or "html" in content_type:
+        text = await run_blocking(
+            get_executor("scrape", PARSE_WORKERS),
+            extract_main_content,
+            response.content,
+            response.url,
+            token_budget,
+            include_links,
+        )
+    elif content_type.startswith("text/") or "json" in content_type:
+        text = truncate_to_tokens(
+            response.content.decode("utf-8", errors="replace"), token_budget
+        )
+    else:
+        raise ValueError(f"unsupported content type '{content_type}'")
+    if response.truncated:
+        text += (
+            f"\n\n[Only the first {len(response.content)} bytes of the page were read.]"
+        )
+    return text
+
+
+async def scrape_url(args: BrowseURLArgs) -> str:
+    """Fetches the content from a given URL and returns its main content as clean text,
+    with headings and numbered links. Navigation, banners and footers are left out.
+    Use this tool to read the content of a specific webpage for analysis or summarization.
+    """
+    try:
+        content = await _scrape(args.url, get_settings().scrape_token_budget)
+        return f"Successfully browsed URL '{args.url}'. Content:\n\n{content}"
+    except httpx.HTTPError as e:
         return f"Error browsing URL '{args.url}': {e}"
     except Exception as e:
         return f"An unexpected error occurred while browsing '{args.url}': {e}"
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Returns how long to wait before retrying, or -1 if `error` is permanent."""
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code not in RETRYABLE_STATUS_CODES:
+            return -1
+        retry_after = error.response.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), MAX_RETRY_DELAY_SECONDS)
+    elif not isinstance(error, httpx.TransportError):
+        return -1
+    # Exponential backoff with jitter, so retries against one host spread out.
+    return RETRY_BASE_DELAY_SECONDS * 2**attempt * (1 + random.random())
+
+
+async def _scrape_with_retries(
+    url: str, token_budget: int, slots: asyncio.Semaphore, include_links: bool = True
+) -> str:
+    """Scrapes one page under the call's concurrency limit, retrying transient
+    failures (timeouts, connection errors, 429 and 5xx responses).
+    """
+    retries = get_settings().scrape_retries
+    attempt = 0
+    while True:
+        try:
+            async with slots:
+                return await _scrape(url, token_budget, include_links)
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay < 0 or attempt >= retries:
+                raise
+            logger.warning(f"Retrying '{url}' in {delay:.1f}s after error: {e}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def scrape_pages(
+    urls: List[str], token_budget: int, include_links: bool = True
+) -> List[Union[str, Exception]]:
+    """Scrapes several pages concurrently, at most `scrape_max_concurrency` at
+    a time, retrying transient failures. Each page gets `token_budget`. The
+    outcome of each page is reported as a status update as soon as it is known.
+
+    Returns:
+        Each page's main content, in the order of `urls`, or the exception
+        that kept it from being read.
+
+    """
+    slots = asyncio.Semaphore(get_settings().scrape_max_concurrency)
+    finished = 0
+
+    async def scrape(url: str) -> Union[str, Exception]:
+        nonlocal finished
+        try:
+            content = await _scrape_with_retries(
+                url, token_budget, slots, include_links
+            )
+        except Exception as e:
+            finished += 1
+            report_status(f"⚠️ [{finished}/{len(urls)}] Could not read {url}: {e}")
+            return e
+        finished += 1
+        report_status(f"🌐 [{finished}/{len(urls)}] Read {url}")
+        logger.info(f"Scraped '{url}' ({len(content)} chars).")
+        return content
+
+    return await asyncio.gather(*(scrape(url) for url in urls))
+
+
+async def scrape_urls(args: ScrapeURLsArgs) -> str:
+    """Reads several webpages at once and returns the main content of each,
+    in the order given. Use this instead of calling scrape_url repeatedly when
+    comparing or researching across multiple pages.
+    """
+    urls = list(dict.fromkeys(args.urls))
+    # Every page gets an equal share of the total budget.
+    share = max(200, get_settings().scrape_urls_token_budget // len(urls))
+    results = await scrape_pages(urls, share)
+    return "\n\n".join(
+        f"=== [{i}] {url} ===\n"
+        + (f"Error: {content}" if isinstance(content, Exception) else content)
+        for i, (url, content) in enumerate(zip(urls, results), start=1)
+    )
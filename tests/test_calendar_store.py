@@ -0,0 +1,233 @@
+"""Calendar sync against an in-process fake of the Google Calendar events API."""
+
+import datetime
+import itertools
+from zoneinfo import ZoneInfo
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from valai.config import get_settings
+from valai.core import calendar_store
+from valai.tools import calendar_tools
+
+
+def _event(event_id, summary, days_ahead, hours=1):
+    start = datetime.datetime.now(datetime.UTC).replace(
+        microsecond=0
+    ) + datetime.timedelta(days=days_ahead)
+    end = start + datetime.timedelta(hours=hours)
+    return {
+        "id": event_id,
+        "summary": summary,
+        "status": "confirmed",
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": end.isoformat()},
+    }
+
+
+class _Request:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return self._run()
+
+
+class FakeCalendarAPI:
+    """Serves events.list with paging and sync tokens, and events.insert.
+
+    Every change is appended to a log; a sync token is a position in it, and
+    a delta sync returns the latest version of each event changed since.
+    Tokens listed in `expired` are answered with HTTP 410, as Google does.
+    """
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.log = []
+        self.expired = set()
+        self.list_calls = []
+        self._ids = itertools.count(1)
+
+    # Test helpers.
+
+    def put(self, event):
+        self.log.append(dict(event))
+
+    def cancel(self, event_id):
+        self.log.append({"id": event_id, "status": "cancelled"})
+
+    def current(self):
+        latest = {}
+        for event in self.log:
+            latest[event["id"]] = event
+        return latest
+
+    # The googleapiclient surface used by calendar_tools.
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        params.pop("calendarId")
+        self.list_calls.append(params)
+        return _Request(lambda: self._list(params))
+
+    def insert(self, body, **params):
+        def run():
+            event = dict(body, id=f"new{next(self._ids)}", status="confirmed")
+            event["htmlLink"] = f"https://calendar.test/{event['id']}"
+            self.put(event)
+            return event
+
+        return _Request(run)
+
+    def _list(self, params):
+        token = params.get("syncToken")
+        if token in self.expired:
+            raise HttpError(httplib2.Response({"status": 410}), b"Sync token expired")
+        if token is None:
+            changed = [e for e in self.current().values() if e["status"] != "cancelled"]
+        else:
+            since = {e["id"] for e in self.log[int(token) :]}
+            changed = [e for e in self.current().values() if e["id"] in since]
+        offset = int(params.get("pageToken", 0))
+        page = {"items": changed[offset : offset + self.page_size]}
+        if offset + self.page_size < len(changed):
+            page["nextPageToken"] = str(offset + self.page_size)
+        else:
+            page["nextSyncToken"] = str(len(self.log))
+        return page
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(
+        settings, "calendar_cache_path", str(tmp_path / "calendar.sqlite3")
+    )
+    monkeypatch.setattr(settings, "calendar_sync_interval_seconds", 0)
+    fake = FakeCalendarAPI()
+    monkeypatch.setattr(calendar_tools, "_get_calendar_service", lambda: fake)
+    return fake
+
+
+def _stored_summaries():
+    events = calendar_store.events_between(calendar_tools.CALENDAR_ID, 0)
+    return [event["summary"] for event in events]
+
+
+def _list_events():
+    return calendar_tools.list_upcoming_events(calendar_tools.ListEventsArgs())
+
+
+def test_full_sync_pages_through_every_event(api):
+    for day in range(1, 6):
+        api.put(_event(f"e{day}", f"Event {day}", day))
+
+    output = _list_events()
+
+    assert _stored_summaries() == [f"Event {day}" for day in range(1, 6)]
+    assert output.splitlines()[1].endswith("Event 1")
+    # Three pages of two, the first without a sync token and with a time floor.
+    assert len(api.list_calls) == 3
+    assert "syncToken" not in api.list_calls[0]
+    assert "timeMin" in api.list_calls[0]
+    token, _ = calendar_store.get_sync_state(calendar_tools.CALENDAR_ID)
+    assert token == str(len(api.log))
+
+
+def test_delta_sync_applies_updates_and_cancellations(api):
+    api.put(_event("a", "Standup", 1))
+    api.put(_event("b", "Review", 2))
+    api.put(_event("c", "Retro", 3))
+    _list_events()
+    api.list_calls.clear()
+
+    api.put(_event("a", "Standup (moved)", 4))
+    api.cancel("b")
+    api.put(_event("d", "Planning", 5))
+    _list_events()
+
+    assert api.list_calls[0]["syncToken"] == "3"
+    assert _stored_summaries() == ["Retro", "Standup (moved)", "Planning"]
+
+
+def test_expired_sync_token_falls_back_to_full_sync(api):
+    api.put(_event("a", "Kept", 1))
+    api.put(_event("b", "Deleted upstream", 2))
+    _list_events()
+    token, _ = calendar_store.get_sync_state(calendar_tools.CALENDAR_ID)
+    # The deletion is only visible to a full sync once the token has expired.
+    api.log = [e for e in api.log if e["id"] != "b"]
+    api.expired.add(token)
+
+    _list_events()
+
+    assert _stored_summaries() == ["Kept"]
+    assert "syncToken" not in api.list_calls[-1]
+
+
+def test_sync_is_throttled_to_the_interval(api, monkeypatch):
+    api.put(_event("a", "Standup", 1))
+    _list_events()
+    monkeypatch.setattr(get_settings(), "calendar_sync_interval_seconds", 60)
+    calls = len(api.list_calls)
+
+    api.put(_event("b", "Not yet synced", 2))
+    _list_events()
+
+    assert len(api.list_calls) == calls
+    assert _stored_summaries() == ["Standup"]
+
+
+def test_created_event_is_written_through(api, monkeypatch):
+    _list_events()
+    monkeypatch.setattr(get_settings(), "calendar_sync_interval_seconds", 60)
+    event = _event("unused", "Dentist", 1)
+
+    output = calendar_tools.create_calendar_event(
+        calendar_tools.CreateEventArgs(
+            summary="Dentist",
+            start_time=event["start"]["dateTime"],
+            end_time=event["end"]["dateTime"],
+        )
+    )
+
+    assert "created successfully" in output
+    assert _stored_summaries() == ["Dentist"]
+    assert "Dentist" in _list_events()
+
+
+def test_all_day_events_block_their_dates_in_the_searched_zone(api, monkeypatch):
+    monkeypatch.setenv("TZ", "UTC")
+    monkeypatch.setattr(get_settings(), "calendar_timezone", "")
+    calendar_store.apply_changes(
+        calendar_tools.CALENDAR_ID,
+        [
+            {
+                "id": "holiday",
+                "summary": "Holiday",
+                "status": "confirmed",
+                "start": {"date": "2026-10-27"},
+                "end": {"date": "2026-10-28"},
+            }
+        ],
+        None,
+    )
+    new_york = ZoneInfo("America/New_York")
+
+    busy = calendar_store.busy_intervals(
+        calendar_tools.CALENDAR_ID,
+        datetime.datetime(2026, 10, 26, tzinfo=new_york).timestamp(),
+        datetime.datetime(2026, 10, 29, tzinfo=new_york).timestamp(),
+        new_york,
+    )
+
+    assert busy == [
+        (
+            datetime.datetime(2026, 10, 27, tzinfo=new_york).timestamp(),
+            datetime.datetime(2026, 10, 28, tzinfo=new_york).timestamp(),
+        )
+    ]
@@ -0,0 +1,57 @@
+"""Working hours and free slots across a daylight saving change."""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+from valai.core import scheduling
+
+BERLIN = ZoneInfo("Europe/Berlin")
+NINE = datetime.time(9)
+FIVE = datetime.time(17)
+
+
+def _utc(*args):
+    return datetime.datetime(*args, tzinfo=datetime.UTC).timestamp()
+
+
+def _hours(intervals):
+    return [
+        (
+            datetime.datetime.fromtimestamp(start, datetime.UTC).strftime("%a %H:%M"),
+            datetime.datetime.fromtimestamp(end, datetime.UTC).strftime("%a %H:%M"),
+        )
+        for start, end in intervals
+    ]
+
+
+def test_working_windows_follow_the_clock_change():
+    # Berlin leaves summer time on Sunday 2026-10-25.
+    windows = scheduling.working_windows(
+        _utc(2026, 10, 23), _utc(2026, 10, 27), BERLIN, NINE, FIVE
+    )
+
+    assert _hours(windows) == [
+        ("Fri 07:00", "Fri 15:00"),  # 09:00-17:00 CEST
+        ("Mon 08:00", "Mon 16:00"),  # 09:00-17:00 CET
+    ]
+
+
+def test_free_slots_across_the_clock_change():
+    index = scheduling.BusyIndex([(_utc(2026, 10, 26, 8), _utc(2026, 10, 26, 12))])
+    windows = scheduling.working_windows(
+        _utc(2026, 10, 23), _utc(2026, 10, 27), BERLIN, NINE, FIVE
+    )
+
+    slots = scheduling.find_free_slots(index, windows, 3600)
+
+    assert _hours(slots) == [("Fri 07:00", "Fri 15:00"), ("Mon 12:00", "Mon 16:00")]
+
+
+def test_local_zone_is_resolved_by_name(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+
+    tz = scheduling.resolve_timezone("")
+
+    assert tz.key == "Europe/Berlin"
+    monday = datetime.datetime.combine(datetime.date(2026, 10, 26), NINE, tzinfo=tz)
+    assert monday.timestamp() == _utc(2026, 10, 26, 8)